@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Batch Module
+Converts many results files at once for ``viewer_generator``, spread over a
+process pool.
+
+Inputs may be files, directories (searched recursively) or glob patterns.
+Every file is converted exactly as in single-file mode; files found under a
+directory keep their relative sub-directory inside the output directory so
+equal names in different folders do not collide.
+"""
+
+import contextlib
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from profiling import StageProfiler
+from xml_parser import COMPRESSED_SUFFIXES, results_base_name
+
+RESULTS_SUFFIXES = ('.xml',) + tuple(f".xml{suffix}" for suffix in COMPRESSED_SUFFIXES)
+
+
+class BatchItem(NamedTuple):
+    """One input file and the directory its viewer is written to"""
+    source: Path
+    output_dir: Path
+
+    @property
+    def viewer_path(self) -> Path:
+        return self.output_dir / f"{results_base_name(str(self.source))}-viewer.html"
+
+    @property
+    def profile_paths(self) -> Tuple[Path, Path]:
+        """Where ``--profile`` writes the stage JSON and cProfile statistics"""
+        base_name = results_base_name(str(self.source))
+        return (self.output_dir / f"{base_name}-profile.json",
+                self.output_dir / f"{base_name}-profile.pstats")
+
+
+class BatchResult(NamedTuple):
+    item: BatchItem
+    success: bool
+    seconds: float
+    error: Optional[str]
+
+
+def is_results_file(path: Path) -> bool:
+    """True for ``.xml`` files and their gzip/xz/bzip2 compressed forms"""
+    return path.name.lower().endswith(RESULTS_SUFFIXES)
+
+
+def collect_inputs(patterns: List[str], output_dir: str) -> List[BatchItem]:
+    """Expand *patterns* (files, directories, globs) into batch items.
+
+    Explicitly named files and glob matches are written straight into
+    *output_dir*; files found by walking a directory are written to the
+    same relative sub-directory of *output_dir*. Duplicates are dropped.
+    """
+    items: List[BatchItem] = []
+    seen = set()
+    out = Path(output_dir)
+
+    def add(source: Path, target: Path) -> None:
+        key = source.resolve()
+        if key not in seen:
+            seen.add(key)
+            items.append(BatchItem(source, target))
+
+    for pattern in patterns:
+        if any(ch in pattern for ch in '*?['):
+            matches = sorted(Path(p) for p in glob.glob(pattern, recursive=True))
+        else:
+            matches = [Path(pattern)]
+
+        for match in matches:
+            if match.is_dir():
+                for source in sorted(match.rglob('*')):
+                    if source.is_file() and is_results_file(source):
+                        add(source, out / source.parent.relative_to(match))
+            else:
+                # Missing files are kept so the summary reports them
+                add(match, out)
+    return items
+
+
+def make_profiler(item: BatchItem, profile: bool, pstats: bool) -> Optional[StageProfiler]:
+    """The profiler for converting *item* with ``--profile`` / ``--pstats``"""
+    if not (profile or pstats):
+        return None
+    return StageProfiler(pstats_path=str(item.profile_paths[1]) if pstats else None)
+
+
+def convert_item(item: BatchItem, backend: Optional[str], precompress: bool,
+                 document=None, profile: bool = False, pstats: bool = False) -> BatchResult:
+    """Convert one file, capturing the generator's console output (also the
+    pool worker). *document* is passed on to ``create_viewer``. With
+    *profile* (or *pstats*) the stage profile is saved beside the viewer.
+    """
+    # Imported here because viewer_generator imports this module
+    from viewer_generator import create_viewer
+
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        item.output_dir.mkdir(parents=True, exist_ok=True)
+        profiler = make_profiler(item, profile, pstats)
+        with contextlib.redirect_stdout(log):
+            with profiler.run() if profiler else contextlib.nullcontext():
+                success = create_viewer(str(item.source), backend=backend,
+                                        output_dir=str(item.output_dir), precompress=precompress,
+                                        document=document, profiler=profiler)
+        if profiler is not None:
+            profiler.save(str(item.profile_paths[0]), input=str(item.source))
+    except Exception as e:
+        success = False
+        print(f"Error creating viewer: {e}", file=log)
+    seconds = time.perf_counter() - start
+
+    error = None
+    if not success:
+        errors = [line for line in log.getvalue().splitlines() if line.startswith('Error')]
+        error = errors[-1] if errors else "conversion failed"
+    return BatchResult(item, success, seconds, error)
+
+
+def _find_collisions(items: List[BatchItem]) -> Dict[BatchItem, Path]:
+    """Map each item whose viewer path is already taken to the earlier source"""
+    owners = {}
+    collisions = {}
+    for item in items:
+        if item.viewer_path in owners:
+            collisions[item] = owners[item.viewer_path]
+        else:
+            owners[item.viewer_path] = item.source
+    return collisions
+
+
+def run_batch(items: List[BatchItem], jobs: Optional[int] = None, backend: Optional[str] = None,
+              precompress: bool = False, profile: bool = False,
+              pstats: bool = False) -> List[BatchResult]:
+    """Convert *items* with up to *jobs* processes (default: one per CPU).
+
+    Results are returned in input order.
+    """
+    results: List[Optional[BatchResult]] = [None] * len(items)
+    collisions = _find_collisions(items)
+    pending = []
+    for i, item in enumerate(items):
+        if item in collisions:
+            results[i] = BatchResult(item, False, 0.0,
+                                     f"Error: output name already used by {collisions[item]}")
+        else:
+            pending.append(i)
+
+    if pending:
+        workers = min(jobs or os.cpu_count() or 1, len(pending))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {i: pool.submit(convert_item, items[i], backend, precompress,
+                                      None, profile, pstats)
+                       for i in pending}
+            for i, future in futures.items():
+                results[i] = future.result()
+    return results
+
+
+def print_summary(results: List[BatchResult], wall_seconds: float, skipped: int = 0) -> None:
+    """Print a table of per-file timings and outcomes; *skipped* counts
+    inputs that were already up to date
+    """
+    rows = [(str(r.item.source), f"{r.seconds:.2f}", "ok" if r.success else r.error)
+            for r in results]
+    headers = ("Input", "Time (s)", "Result")
+    widths = [max([len(headers[c])] + [len(row[c]) for row in rows]) for c in range(2)]
+
+    if rows:
+        print(f"{headers[0]:<{widths[0]}}  {headers[1]:>{widths[1]}}  {headers[2]}")
+        print(f"{'-' * widths[0]}  {'-' * widths[1]}  {'-' * len(headers[2])}")
+        for source, seconds, result in rows:
+            print(f"{source:<{widths[0]}}  {seconds:>{widths[1]}}  {result}")
+        print()
+
+    failed = sum(1 for r in results if not r.success)
+    busy = sum(r.seconds for r in results)
+    print(f"{len(results) - failed} converted, {failed} failed, {skipped} up to date "
+          f"in {wall_seconds:.2f}s ({busy:.2f}s of conversion work)")
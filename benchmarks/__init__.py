@@ -0,0 +1,7 @@
+"""
+Benchmarks for the RHCert viewer generator.
+
+Run the scripts from the project root as modules, e.g.::
+
+    python -m benchmarks.bench_records_memory
+"""
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parse time of each available XML backend on generated fixtures.
+
+    python -m benchmarks.bench_backends --sizes 10000 100000 --repeat 3
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import write_results_xml
+from xml_backends import available_backends, get_backend
+from xml_parser import extract_test_structure_streaming
+
+COMMANDS_PER_TEST = 100
+
+
+def _best_parse_time(xml_path: str, backend_name: str, repeat: int) -> float:
+    backend = get_backend(backend_name)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract_test_structure_streaming(xml_path, backend=backend)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000],
+                        help='total commands per fixture')
+    parser.add_argument('--output-bytes', type=int, default=256,
+                        help='bytes of <output> text per command')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    if 'lxml' not in backends:
+        print("lxml is not installed; only the stdlib backend will be measured")
+
+    header = f"{'commands':>9} {'MB':>7}" + ''.join(f" {name + ' (s)':>12}" for name in backends)
+    if len(backends) > 1:
+        header += f" {'speedup':>8}"
+    print(header)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            xml_path = write_results_xml(
+                os.path.join(tmp, f'results-{size}.xml'),
+                tests=max(1, size // COMMANDS_PER_TEST),
+                commands_per_test=min(size, COMMANDS_PER_TEST),
+                output_bytes=args.output_bytes,
+            )
+            megabytes = os.path.getsize(xml_path) / 1e6
+            times = {name: _best_parse_time(xml_path, name, args.repeat) for name in backends}
+
+            row = f"{size:>9} {megabytes:>7.1f}" + ''.join(f" {times[name]:>12.3f}" for name in backends)
+            if len(backends) > 1:
+                row += f" {times['stdlib'] / times['lxml']:>7.2f}x"
+            print(row)
+
+
+if __name__ == '__main__':
+    main()
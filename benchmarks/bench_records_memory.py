@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: slotted TestRecord/CommandRecord vs. the previous plain dicts.
+
+    python -m benchmarks.bench_records_memory --tests 200 --commands 500
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.fixtures import write_results_xml
+from xml_parser import iter_test_structure
+
+
+def _as_legacy_dict(test) -> Dict:
+    """Rebuild the dict layout extract_test_structure used to return"""
+    commands = [{
+        'number': cmd.number,
+        'text': cmd.text,
+        'return_value': cmd.return_value,
+        'status': 'PASS' if cmd.return_value == '0' else 'FAIL'
+    } for cmd in test.commands]
+    passed = sum(1 for cmd in commands if cmd['status'] == 'PASS')
+    return {
+        'name': test.name,
+        'description': test.description,
+        'logical_device': test.logical_device,
+        'status': str(test.status),
+        'commands': commands,
+        'command_count': len(commands),
+        'total_commands': len(commands),
+        'passed_commands': passed
+    }
+
+
+def _retained_bytes(build: Callable[[], List]) -> int:
+    """Bytes still allocated once *build* has returned its result"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tests', type=int, default=200)
+    parser.add_argument('--commands', type=int, default=500, help='commands per test')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_path = write_results_xml(os.path.join(tmp, 'results.xml'),
+                                     tests=args.tests, commands_per_test=args.commands)
+
+        records = _retained_bytes(lambda: list(iter_test_structure(xml_path)))
+        legacy = _retained_bytes(lambda: [_as_legacy_dict(t) for t in iter_test_structure(xml_path)])
+
+    total = args.tests * args.commands
+    print(f"{args.tests} tests x {args.commands} commands ({total} commands)")
+    print(f"  dicts:   {legacy / 1e6:8.1f} MB  ({legacy / total:6.1f} B/command)")
+    print(f"  records: {records / 1e6:8.1f} MB  ({records / total:6.1f} B/command)")
+    print(f"  saving:  {(1 - records / legacy) * 100:8.1f} %")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: how each pipeline step scales from 1k to 1M commands.
+
+Times ``extract_test_structure`` (tree parse and walk), the streaming parse
+used by ``create_viewer``, ``generate_sidebar_html``, ``create_html_file`` and
+the full ``create_viewer`` on generated fixtures. Results are written as JSON;
+given a baseline from an earlier run, the script exits with status 1 if any
+step got slower by more than the threshold.
+
+    python -m benchmarks.bench_scaling --sizes 1000 10000 --output baseline.json
+    python -m benchmarks.bench_scaling --sizes 1000 10000 --baseline baseline.json --threshold 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.fixtures import write_results_xml
+from html_generator import create_html_file, generate_sidebar_html
+from search_index import build_search_index
+from viewer_generator import create_viewer, generator_version
+from xml_backends import get_backend
+from xml_parser import ResultsDocument, extract_test_structure
+
+BENCHMARKS = ('extract_test_structure', 'parse', 'generate_sidebar_html',
+              'create_html_file', 'create_viewer')
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Differences below this many seconds are noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def _best_time(func: Callable[[], object], repeat: int) -> Tuple[float, List[float]]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return min(runs), runs
+
+
+def _bench_fixture(xml_path: str, workdir: str, names: List[str], repeat: int) -> Dict[str, Tuple]:
+    """Time each benchmark in *names* on one fixture"""
+    document = ResultsDocument.load(xml_path, get_backend())
+    search_index = build_search_index(document.tests)
+    html_path = os.path.join(workdir, 'bench-viewer.html')
+
+    def viewer() -> None:
+        # create_viewer reports progress on stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            if not create_viewer(xml_path, output_dir=workdir):
+                raise RuntimeError(f"create_viewer failed on {xml_path}")
+
+    steps = {
+        'extract_test_structure': lambda: extract_test_structure(ET.parse(xml_path).getroot()),
+        'parse': lambda: ResultsDocument.load(xml_path, get_backend()),
+        'generate_sidebar_html': lambda: generate_sidebar_html(
+            document.tests, search_index, document.failure_marks),
+        'create_html_file': lambda: create_html_file(
+            xml_path, 'bench.css', 'bench.js', document.tests, document.attributes,
+            html_path, search_index, document.failure_marks),
+        'create_viewer': viewer,
+    }
+    return {name: _best_time(steps[name], repeat) for name in names}
+
+
+def find_regressions(results: List[Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Describe every result slower than its baseline entry by more than *threshold*"""
+    previous = {(r['commands'], r['output_bytes'], r['benchmark']): r['seconds']
+                for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get((result['commands'], result['output_bytes'], result['benchmark']))
+        if old is None:
+            continue
+        new = result['seconds']
+        if new > old * (1 + threshold) and new - old > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{result['benchmark']} at {result['commands']} commands: "
+                               f"{old:.3f}s -> {new:.3f}s (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='total commands per fixture')
+    parser.add_argument('--commands-per-test', type=int, default=100)
+    parser.add_argument('--output-bytes', type=int, default=128,
+                        help='bytes of <output> text per command')
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement (best is kept)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown against the baseline (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'commands':>9} {'MB':>7}" + ''.join(f" {name:>22}" for name in args.benchmarks))
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            xml_path = write_results_xml(
+                os.path.join(tmp, f'results-{size}.xml'),
+                tests=max(1, size // args.commands_per_test),
+                commands_per_test=min(size, args.commands_per_test),
+                output_bytes=args.output_bytes,
+            )
+            file_bytes = os.path.getsize(xml_path)
+            times = _bench_fixture(xml_path, tmp, args.benchmarks, args.repeat)
+            os.unlink(xml_path)
+
+            print(f"{size:>9} {file_bytes / 1e6:>7.1f}"
+                  + ''.join(f" {times[name][0]:>21.3f}s" for name in args.benchmarks), flush=True)
+            for name in args.benchmarks:
+                best, runs = times[name]
+                results.append({'benchmark': name, 'commands': size, 'output_bytes': args.output_bytes,
+                                'file_bytes': file_bytes, 'seconds': best, 'runs': runs})
+
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'generator_version': generator_version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'xml_backend': get_backend().name,
+            'commands_per_test': args.commands_per_test,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold * 100:.0f}% against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold * 100:.0f}% against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
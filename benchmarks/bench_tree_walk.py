@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-pass tree walk vs. per-test ``.//command`` descendant searches.
+
+Builds synthetic trees of nested ``<test>`` elements and times the current
+``extract_test_structure`` against the previous findall-based approach,
+which rescans every test's subtree once per enclosing test.
+
+    python -m benchmarks.bench_tree_walk --depth 10 50 200 --commands 20
+"""
+
+import argparse
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, List
+
+from xml_parser import extract_test_structure
+
+
+def build_deep_tree(depth: int, commands_per_test: int) -> ET.Element:
+    """A chain of *depth* nested tests, each owning its own commands"""
+    root = ET.Element('certification-test')
+    parent = ET.SubElement(root, 'tests')
+    for level in range(depth):
+        test = ET.SubElement(parent, 'test', name=f'test-{level}')
+        ET.SubElement(test, 'summary', {'data-value': 'PASS'})
+        for c in range(commands_per_test):
+            ET.SubElement(test, 'command', {'command': f'cmd {level}.{c}', 'return-value': '0'})
+        parent = test
+    return root
+
+
+def findall_extract(root: ET.Element) -> List:
+    """The previous approach: descendant searches from every test"""
+    tests = []
+    for test_elem in root.findall('.//test'):
+        summary_elem = test_elem.find('.//summary')
+        status = summary_elem.get('data-value', 'UNKNOWN') if summary_elem is not None else 'UNKNOWN'
+        commands = [(i, c.get('command', ''), c.get('return-value', '0'))
+                    for i, c in enumerate(test_elem.findall('.//command'), 1)
+                    if c.get('command', '')]
+        tests.append((test_elem.get('name'), status, commands))
+    return tests
+
+
+def _best_of(func: Callable, arg, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--depth', type=int, nargs='+', default=[10, 50, 200, 500])
+    parser.add_argument('--commands', type=int, default=20, help='commands per test')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'depth':>6} {'nodes':>8} {'findall (ms)':>13} {'walk (ms)':>10} {'speedup':>8}")
+    for depth in args.depth:
+        root = build_deep_tree(depth, args.commands)
+        nodes = sum(1 for _ in root.iter())
+        old = _best_of(findall_extract, root, args.repeat)
+        new = _best_of(extract_test_structure, root, args.repeat)
+        print(f"{depth:>6} {nodes:>8} {old * 1000:>13.2f} {new * 1000:>10.2f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
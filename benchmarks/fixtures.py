@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Synthetic results XML fixtures used by the benchmarks.
+
+The generated files follow the layout of real rhcert results: a
+``<certification>``/``<hardware>``/``<os>`` header, tests grouped by
+``<device-class>``, and per test one or more ``<run>`` elements holding a
+``<summary>``, ``<message>`` entries and ``<command>`` elements with their
+``<output>``. Content is pseudo-random but deterministic for a given seed.
+
+    python -m benchmarks.fixtures results.xml --tests 1000 --commands-per-test 100
+"""
+
+import argparse
+import random
+from xml.sax.saxutils import escape, quoteattr
+
+DEVICE_CLASSES = ('processor', 'memory', 'storage', 'network', 'video', 'usb', 'firmware', 'kernel')
+TEST_NAMES = ('core', 'memory', 'storage', 'network', 'profiler', 'kdump', 'fv_core',
+              'suspend', 'usb3', 'video_drm', 'firmware_check', 'selinux')
+PROGRAMS = ('/usr/bin/lscpu', '/usr/sbin/dmidecode -t memory', '/usr/bin/fio --name=seq',
+            '/usr/sbin/ethtool -i', '/usr/bin/stress-ng --cpu 4', '/usr/bin/journalctl -b',
+            '/usr/sbin/lspci -vvv', '/usr/bin/udevadm info --export-db')
+OUTPUT_LINES = (
+    'kernel: [{t:10.6f}] pci 0000:00:{n:02x}.0: [8086:a3{n:02x}] type 00 class 0x060000',
+    'kernel: [{t:10.6f}] EXT4-fs (sda{n}): mounted filesystem with ordered data mode',
+    'Read bandwidth: {n} MiB/s, IOPS={t:.0f} <avg & p99 within limits>',
+    'Device {n}: link is up at 10000 Mbps, full duplex, flow control rx/tx',
+    'Checking device /dev/sd{n} ... OK (elapsed {t:.3f}s)',
+    'WARNING: throttling detected on core {n} at {t:.1f}C',
+)
+SUMMARY_VALUES = ('PASS', 'PASS', 'PASS', 'PASS', 'WARN', 'REVIEW', 'FAIL')
+MESSAGE_LEVELS = ('INFO', 'INFO', 'INFO', 'DEBUG', 'WARN', 'FAIL')
+
+
+def _output_text(rng: random.Random, size: int) -> str:
+    """About *size* characters of log-like command output"""
+    lines = []
+    length = 0
+    while length < size:
+        line = rng.choice(OUTPUT_LINES).format(t=rng.random() * 1000, n=rng.randrange(256))
+        lines.append(line)
+        length += len(line) + 1
+    return escape('\n'.join(lines)[:size])
+
+
+def write_results_xml(path: str, tests: int = 100, commands_per_test: int = 100,
+                      output_bytes: int = 64, fail_every: int = 7, runs_per_test: int = 1,
+                      messages_per_run: int = 2, seed: int = 0) -> str:
+    """Write a synthetic rhcert results file to *path* and return the path.
+
+    Every *fail_every*-th command exits non-zero (0 disables failures); each
+    command has about *output_bytes* of output. The commands of a test are
+    spread over *runs_per_test* runs.
+    """
+    rng = random.Random(seed)
+    # A pool of outputs keeps generation fast for millions of commands
+    outputs = [_output_text(rng, output_bytes) for _ in range(64)] if output_bytes else ['']
+    runs_per_test = max(1, min(runs_per_test, commands_per_test or 1))
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<certification-test rhcert-version="10.0" rhcert-release="1" '
+                'plan-time="2025-01-01 00:00:00">\n')
+        f.write('  <certification id="123456" type="hardware" product="Synthetic Server 9000" '
+                'vendor="ACME Corp." status="in-progress"/>\n')
+        f.write('  <hardware>\n    <vendor>ACME Corp.</vendor>\n    <model>SYN-9000</model>\n'
+                '    <cpu count="64">Synthetic CPU @ 3.00GHz</cpu>\n'
+                '    <memory unit="MiB">524288</memory>\n  </hardware>\n')
+        f.write('  <os name="Red Hat Enterprise Linux" version="9.4" kernel="5.14.0-427.el9.x86_64" '
+                'arch="x86_64"/>\n')
+        f.write('  <tests>\n')
+
+        command_number = 0
+        per_class = max(1, -(-tests // len(DEVICE_CLASSES)))
+        for t in range(tests):
+            if t % per_class == 0:
+                if t:
+                    f.write('    </device-class>\n')
+                device_class = DEVICE_CLASSES[(t // per_class) % len(DEVICE_CLASSES)]
+                f.write(f'    <device-class name="{device_class}">\n')
+            name = TEST_NAMES[t % len(TEST_NAMES)]
+            f.write(f'      <test name="{name}-{t}" description={quoteattr(f"Synthetic {name} test {t}")} '
+                    f'logical-device="{name}{t % 8}">\n')
+
+            for run in range(runs_per_test):
+                f.write(f'        <run number="{run + 1}" time="2025-01-01T00:{run % 60:02d}:00">\n')
+                f.write(f'          <summary data-value="{rng.choice(SUMMARY_VALUES)}"/>\n')
+                for m in range(messages_per_run):
+                    f.write(f'          <message level="{rng.choice(MESSAGE_LEVELS)}">'
+                            f'{escape(f"Step {m} of run {run + 1} finished")}</message>\n')
+                first = commands_per_test * run // runs_per_test
+                last = commands_per_test * (run + 1) // runs_per_test
+                for c in range(first, last):
+                    command_number += 1
+                    failed = fail_every and command_number % fail_every == 0
+                    command = quoteattr(f'{PROGRAMS[c % len(PROGRAMS)]} --test {t} --step {c}')
+                    f.write(f'          <command command={command} return-value="{1 if failed else 0}">'
+                            f'<output>{outputs[command_number % len(outputs)]}</output></command>\n')
+                f.write('        </run>\n')
+            f.write('      </test>\n')
+        if tests:
+            f.write('    </device-class>\n')
+        f.write('  </tests>\n</certification-test>\n')
+
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic rhcert results XML file")
+    parser.add_argument('path')
+    parser.add_argument('--tests', type=int, default=100)
+    parser.add_argument('--commands-per-test', type=int, default=100)
+    parser.add_argument('--output-bytes', type=int, default=64,
+                        help='bytes of <output> text per command')
+    parser.add_argument('--runs-per-test', type=int, default=1)
+    parser.add_argument('--fail-every', type=int, default=7,
+                        help='every Nth command fails (0: none)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_results_xml(args.path, args.tests, args.commands_per_test, args.output_bytes,
+                      args.fail_every, args.runs_per_test, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
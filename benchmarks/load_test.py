@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent uploads, downloads and viewer requests against web_server.
+
+Starts ``web_server.app`` in a scratch directory (under gunicorn when it is
+installed, so worker settings can be compared, otherwise the threaded
+Werkzeug server) and drives it from client threads with synthetic results
+files. Reports throughput, p50/p95/p99 latency and errors per request type,
+the upload-to-done conversion time, and the peak RSS of the server processes.
+
+    python -m benchmarks.load_test --workers 3 --threads 4 --clients 16 --duration 60
+    python -m benchmarks.load_test --url http://localhost:8080 --clients 8
+
+The request mix is weighted with ``--mix``: ``view`` and ``download`` upload
+a file (the form's two actions) and follow the job to the viewer or ZIP,
+``zip`` and ``viewer`` fetch the outputs of earlier uploads again.
+``--miss-ratio`` sets the fraction of uploads that are made unique, so they
+are converted instead of served from the result cache.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.fixtures import write_results_xml
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "view=2,download=1,zip=3,viewer=4"
+JOB_TIMEOUT = 600  # seconds a conversion may take before the request counts as failed
+RSS_INTERVAL = 0.5
+
+
+# ---------------------------------------------------------------------------
+# Server process
+# ---------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir: str, args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Start web_server in *workdir* and return the process and its base URL"""
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, RHCERT_JOB_WORKERS=str(args.job_workers),
+               RHCERT_JOB_DB=os.path.join(workdir, "jobs.sqlite3"))
+    try:
+        import gunicorn  # noqa: F401
+        use_gunicorn = not args.werkzeug
+    except ImportError:
+        use_gunicorn = False
+
+    if use_gunicorn:
+        command = [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}",
+                   "--workers", str(args.workers), "--threads", str(args.threads),
+                   "--worker-class", args.worker_class, "--log-level", "warning", "web_server:app"]
+    else:
+        command = [sys.executable, "-c",
+                   "import web_server; web_server.app.run("
+                   f"host='127.0.0.1', port={port}, threaded=True)"]
+    # The access log goes to a file: an unread pipe would fill up and stall the server
+    log_path = os.path.join(workdir, "server.log")
+    with open(log_path, "wb") as log:
+        server = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            with open(log_path, encoding="utf-8", errors="replace") as log:
+                raise RuntimeError(f"Server exited:\n{log.read()}")
+        try:
+            status, _, _ = request("GET", base_url, "/")
+            if status == 200:
+                print(f"Server: {' '.join(command[2:] if use_gunicorn else ['werkzeug (threaded)'])}")
+                return server, base_url
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Server did not start within 30s")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def _process_tree(root: int) -> List[int]:
+    """*root* and all of its descendants (Linux /proc)"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                # The command name may contain spaces; fields resume after ')'
+                ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, todo = [], [root]
+    while todo:
+        pid = todo.pop()
+        pids.append(pid)
+        todo.extend(children.get(pid, []))
+    return pids
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _process_role(pid: int, root: int) -> str:
+    if pid == root:
+        return "server"
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read()
+    except OSError:
+        return "other"
+    # Conversion pools use the spawn start method (plus a resource tracker)
+    if b"spawn_main" in cmdline:
+        return "converter"
+    return "other" if b"multiprocessing" in cmdline else "worker"
+
+
+class RssSampler(threading.Thread):
+    """Samples the RSS of a process tree, keeping the peaks per role"""
+
+    def __init__(self, root: int):
+        super().__init__(daemon=True)
+        self.root = root
+        self.peak_total = 0
+        self.peak_process: Dict[str, int] = {}
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(RSS_INTERVAL):
+            total = 0
+            for pid in _process_tree(self.root):
+                rss = _rss_bytes(pid)
+                if rss is None:
+                    continue
+                total += rss
+                role = _process_role(pid, self.root)
+                self.peak_process[role] = max(self.peak_process.get(role, 0), rss)
+            self.peak_total = max(self.peak_total, total)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+# ---------------------------------------------------------------------------
+# HTTP client
+# ---------------------------------------------------------------------------
+
+def request(method: str, base_url: str, path: str, body: bytes = b"",
+            headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """One request on a fresh connection; returns (status, headers, body)"""
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=JOB_TIMEOUT)
+    try:
+        conn.request(method, path, body=body or None, headers=headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, data
+    finally:
+        conn.close()
+
+
+def _multipart(filename: str, content: bytes, action: str) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = b"".join([
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"action\"\r\n\r\n{action}\r\n".encode(),
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        "Content-Type: application/xml\r\n\r\n".encode(),
+        content,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class Stats:
+    """Latencies and errors per request type, shared by the client threads"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.latencies.setdefault(kind, []).append(seconds)
+            else:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def timed(self, kind: str, method: str, base_url: str, path: str, expect: Tuple[int, ...],
+              **kwargs) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        start = time.perf_counter()
+        try:
+            response = request(method, base_url, path, **kwargs)
+        except OSError:
+            response = None
+        ok = response is not None and response[0] in expect
+        self.record(kind, time.perf_counter() - start, ok)
+        return response if ok else None
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# ---------------------------------------------------------------------------
+# Client scenarios
+# ---------------------------------------------------------------------------
+
+class LoadClient(threading.Thread):
+    def __init__(self, base_url: str, fixtures: List[Tuple[str, bytes]], mix: List[Tuple[str, int]],
+                 miss_ratio: float, stats: Stats, done: List[Dict], deadline: float, seed: int):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.fixtures = fixtures
+        self.kinds = [kind for kind, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.miss_ratio = miss_ratio
+        self.stats = stats
+        self.done = done  # finished jobs, shared by all clients
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+
+    def run(self) -> None:
+        while time.monotonic() < self.deadline:
+            kind = self.rng.choices(self.kinds, self.weights)[0]
+            if kind in ("zip", "viewer") and not self.done:
+                kind = "view"
+            getattr(self, f"_{kind}")()
+
+    def _upload(self, action: str) -> Optional[Dict]:
+        name, content = self.rng.choice(self.fixtures)
+        if self.rng.random() < self.miss_ratio:
+            # New bytes, so the upload misses the result cache
+            content += f"<!-- {uuid.uuid4().hex} -->\n".encode()
+        body, content_type = _multipart(name, content, action)
+        response = self.stats.timed(f"upload ({action})", "POST", self.base_url, "/upload",
+                                    (200, 202), body=body,
+                                    headers={"Content-Type": content_type, "Accept": "application/json"})
+        if response is None:
+            return None
+
+        job = json.loads(response[2])
+        start = time.perf_counter()
+        while job["state"] not in ("done", "failed"):
+            if time.perf_counter() - start > JOB_TIMEOUT:
+                self.stats.record("conversion", JOB_TIMEOUT, False)
+                return None
+            time.sleep(0.2)
+            polled = self.stats.timed("job status", "GET", self.base_url, job["status_url"], (200,))
+            if polled is None:
+                return None
+            job = json.loads(polled[2])
+        if response[0] == 202:
+            self.stats.record("conversion", time.perf_counter() - start, job["state"] == "done")
+        if job["state"] != "done":
+            return None
+        self.done.append(job)
+        return job
+
+    def _view(self) -> None:
+        job = self._upload("view")
+        if job is not None:
+            self._fetch_viewer(job)
+
+    def _download(self) -> None:
+        job = self._upload("download")
+        if job is not None:
+            self._fetch_zip(job)
+
+    def _zip(self) -> None:
+        self._fetch_zip(self.rng.choice(self.done))
+
+    def _viewer(self) -> None:
+        self._fetch_viewer(self.rng.choice(self.done))
+
+    def _fetch_viewer(self, job: Dict) -> None:
+        self.stats.timed("GET viewer", "GET", self.base_url, job["viewer_url"], (200,),
+                         headers={"Accept-Encoding": "br, gzip"})
+
+    def _fetch_zip(self, job: Dict) -> None:
+        self.stats.timed("GET zip", "GET", self.base_url, job["download_url"], (200,))
+
+
+def _parse_mix(text: str) -> List[Tuple[str, int]]:
+    mix = []
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ("view", "download", "zip", "viewer"):
+            raise argparse.ArgumentTypeError(f"unknown request type '{kind}'")
+        mix.append((kind, int(weight or 1)))
+    return mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="load an already running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=3, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--worker-class", default="gthread", help="gunicorn worker class")
+    parser.add_argument("--werkzeug", action="store_true",
+                        help="use the threaded Werkzeug server even if gunicorn is installed")
+    parser.add_argument("--job-workers", type=int, default=2, help="RHCERT_JOB_WORKERS of the server")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client threads")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to generate load")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX),
+                        help=f"weighted request types (default: {DEFAULT_MIX})")
+    parser.add_argument("--miss-ratio", type=float, default=0.2,
+                        help="fraction of uploads made unique so they are converted")
+    parser.add_argument("--fixtures", type=int, default=4, help="distinct results files to upload")
+    parser.add_argument("--commands", type=int, default=10_000, help="commands per results file")
+    parser.add_argument("--output-bytes", type=int, default=128,
+                        help="bytes of <output> text per command")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rhcert-load-")
+    server = None
+    sampler = None
+    try:
+        fixtures = []
+        for i in range(args.fixtures):
+            path = write_results_xml(os.path.join(workdir, f"load-{i}.xml"),
+                                     tests=max(1, args.commands // 100),
+                                     commands_per_test=min(args.commands, 100),
+                                     output_bytes=args.output_bytes, seed=args.seed + i)
+            with open(path, "rb") as f:
+                fixtures.append((os.path.basename(path), f.read()))
+        print(f"Fixtures: {args.fixtures} x {len(fixtures[0][1]) / 1e6:.1f} MB "
+              f"({args.commands} commands)")
+
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            server, base_url = start_server(workdir, args)
+            if os.path.isdir("/proc"):
+                sampler = RssSampler(server.pid)
+                sampler.start()
+
+        stats = Stats()
+        done: List[Dict] = []
+        start = time.monotonic()
+        clients = [LoadClient(base_url, fixtures, args.mix, args.miss_ratio, stats, done,
+                              start + args.duration, args.seed + 1000 + i)
+                   for i in range(args.clients)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - start
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if server is not None:
+            stop_server(server)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = []
+    print(f"\n{'request':<18} {'count':>7} {'errors':>6} {'req/s':>8} "
+          f"{'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for kind in sorted(set(stats.latencies) | set(stats.errors)):
+        latencies = sorted(stats.latencies.get(kind, []))
+        errors = stats.errors.get(kind, 0)
+        row = {"request": kind, "count": len(latencies) + errors, "errors": errors,
+               "per_second": len(latencies) / elapsed}
+        for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            row[f"{name}_ms"] = _percentile(latencies, fraction) * 1000 if latencies else None
+        results.append(row)
+        print(f"{kind:<18} {row['count']:>7} {errors:>6} {row['per_second']:>8.1f} "
+              + " ".join(f"{row[p]:>9.1f}" if row[p] is not None else f"{'-':>9}"
+                         for p in ("p50_ms", "p95_ms", "p99_ms")))
+
+    rss = None
+    if sampler is not None:
+        rss = {"peak_total_bytes": sampler.peak_total,
+               "peak_per_process_bytes": sampler.peak_process}
+        print(f"\nPeak RSS: {sampler.peak_total / 1024 ** 2:.0f} MiB in total; largest "
+              + ", ".join(f"{role} {value / 1024 ** 2:.0f} MiB"
+                          for role, value in sorted(sampler.peak_process.items())))
+
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key != "output"}
+        config["mix"] = dict(args.mix)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "duration_seconds": elapsed,
+                       "requests": results, "rss": rss}, f, indent=1)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
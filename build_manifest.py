@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Build Manifest Module
+Remembers which results files were converted into an output directory, so a
+batch run only converts new or changed inputs.
+
+For every input the manifest (``.rhcert-manifest.json`` in the output
+directory) records its size, mtime and SHA-256, the generator version and
+options it was converted with, and the files that conversion produced. An
+input is unchanged when its size and mtime match; when only the mtime differs
+(e.g. after a fresh checkout) the hash decides. Outputs of inputs that no
+longer exist are deleted.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from batch import BatchItem, BatchResult
+from precompress import ENCODINGS, available_encodings
+
+MANIFEST_FILENAME = ".rhcert-manifest.json"
+MANIFEST_FORMAT = 1
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_fingerprint(path: Path) -> Dict:
+    """Size, mtime and SHA-256 of *path*"""
+    st = path.stat()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+class BuildManifest:
+    """Inputs converted into *output_dir* and the outputs they own"""
+
+    def __init__(self, output_dir: str, version: str, precompress: bool):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_FILENAME
+        self.version = version
+        self.precompress = precompress
+        self.entries: Dict[str, Dict] = {}
+        # Fingerprints of inputs about to be converted, taken beforehand so
+        # an input modified mid-conversion is picked up by the next run
+        self._pending: Dict[str, Dict] = {}
+
+    @classmethod
+    def load(cls, output_dir: str, version: str, precompress: bool) -> 'BuildManifest':
+        """Read the manifest of *output_dir*; a missing or unreadable one is empty"""
+        manifest = cls(output_dir, version, precompress)
+        try:
+            data = json.loads(manifest.path.read_text(encoding='utf-8'))
+            if data.get("format") == MANIFEST_FORMAT:
+                manifest.entries = data["inputs"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return manifest
+
+    def save(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        data = {"format": MANIFEST_FORMAT, "inputs": self.entries}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _key(item: BatchItem) -> str:
+        return os.path.abspath(item.source)
+
+    def _outputs(self, item: BatchItem) -> List[str]:
+        """Files owned by *item*'s conversion, relative to the output directory"""
+        viewer = os.path.relpath(item.viewer_path, self.output_dir)
+        outputs = [viewer]
+        if self.precompress:
+            encodings = available_encodings()
+            outputs += [viewer + suffix for encoding, suffix in ENCODINGS if encoding in encodings]
+        return outputs
+
+    def prune(self) -> int:
+        """Delete the outputs of inputs that no longer exist; returns their number"""
+        removed = [key for key in self.entries if not os.path.exists(key)]
+        for key in removed:
+            for output in self.entries.pop(key)["outputs"]:
+                try:
+                    os.unlink(self.output_dir / output)
+                except FileNotFoundError:
+                    pass
+        return len(removed)
+
+    def _is_current(self, item: BatchItem, entry: Optional[Dict], assets: Iterable[str]) -> bool:
+        if (entry is None or entry["generator"] != self.version
+                or entry["precompress"] != self.precompress
+                or entry["outputs"] != self._outputs(item)):
+            return False
+        if not all((self.output_dir / output).exists() for output in entry["outputs"]):
+            return False
+        if not all((item.output_dir / asset).exists() for asset in assets):
+            return False
+
+        st = item.source.stat()
+        if st.st_size != entry["size"]:
+            return False
+        if st.st_mtime_ns == entry["mtime_ns"]:
+            return True
+        fingerprint = file_fingerprint(item.source)
+        if fingerprint["sha256"] != entry["sha256"]:
+            self._pending[self._key(item)] = fingerprint
+            return False
+        # Touched but unchanged: remember the new mtime to skip hashing next time
+        entry["mtime_ns"] = fingerprint["mtime_ns"]
+        return True
+
+    def outdated(self, items: List[BatchItem], assets: Iterable[str],
+                 force: bool = False) -> List[BatchItem]:
+        """Items that need converting: new, changed, converted by another
+        generator version or options, or with missing outputs (including
+        the shared *assets* beside the viewer). *force* selects all items.
+        """
+        assets = tuple(assets)
+        todo = []
+        for item in items:
+            key = self._key(item)
+            try:
+                if not force and self._is_current(item, self.entries.get(key), assets):
+                    continue
+                if key not in self._pending:
+                    self._pending[key] = file_fingerprint(item.source)
+            except OSError:
+                # Unreadable input: let the conversion report the error
+                pass
+            todo.append(item)
+        return todo
+
+    def record(self, result: BatchResult) -> None:
+        """Store the outcome of converting an item returned by ``outdated``"""
+        key = self._key(result.item)
+        fingerprint = self._pending.pop(key, None)
+        if not result.success or fingerprint is None:
+            # Convert it again next time
+            self.entries.pop(key, None)
+            return
+        self.entries[key] = dict(fingerprint, generator=self.version,
+                                 precompress=self.precompress,
+                                 outputs=self._outputs(result.item))
@@ -4,6 +4,8 @@ CSS Generator Module
 Handles generation of CSS styling for the Red Hat certification viewer.
 """
 
+from static_assets import asset_filename, write_asset
+
 
 def generate_css_content() -> str:
     """Generate the complete CSS content for the viewer"""
@@ -633,6 +635,11 @@ os build::before {
     transform: translateY(-1px);
 }
 
+.nav-sidebar.only-failures #failedToggle {
+    background: rgba(255,255,255,0.9);
+    color: #cc0000;
+}
+
 .nav-search {
     width: 100%;
     padding: 6px;
@@ -653,6 +660,26 @@ os build::before {
     padding: 10px;
 }
 
+/* Virtualized navigator: rows are absolutely positioned by the script */
+.nav-rows {
+    position: relative;
+    padding: 0;
+}
+
+.nav-row {
+    position: absolute;
+    left: 0;
+    right: 0;
+    box-sizing: border-box;
+    margin: 0;
+    overflow: hidden;
+}
+
+.test-item.nav-row .test-header {
+    height: 100%;
+    box-sizing: border-box;
+}
+
 .test-item {
     margin-bottom: 8px;
     border: 1px solid #dee2e6;
@@ -721,17 +748,6 @@ os build::before {
     color: #6c757d;
 }
 
-.command-list {
-    display: none;
-    max-height: 200px;
-    overflow-y: auto;
-    background: #f8f9fa;
-}
-
-.command-list.expanded {
-    display: block;
-}
-
 .command-item {
     padding: 4px 8px;
     border-top: 1px solid #e9ecef;
@@ -789,7 +805,8 @@ os build::before {
 }
 
 /* Command Highlighting (simple) */
-command.highlight {
+command.highlight,
+message.highlight {
     background: #fff3cd !important; /* soft yellow */
     border: 2px solid #ffc107 !important;
     border-radius: 4px !important;
@@ -837,11 +854,13 @@ command.highlight {
 }'''
 
 
-def create_css_file(base_name: str) -> str:
-    """Create CSS file and return filename"""
-    css_filename = f"{base_name}-styles.css"
+def css_asset_filename() -> str:
+    """Content-hashed filename of the shared CSS file"""
+    return asset_filename(generate_css_content(), 'css')
 
-    with open(css_filename, 'w', encoding='utf-8') as f:
-        f.write(generate_css_content())
 
-    return css_filename
\ No newline at end of file
+def create_css_file(output_dir: str = '.') -> str:
+    """Create the shared CSS file in *output_dir* unless present and return its filename"""
+    css_filename = css_asset_filename()
+    write_asset(output_dir, css_filename, generate_css_content())
+    return css_filename
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+File Watch Module
+Waits for results files to change, for ``viewer_generator --watch``.
+
+On Linux, directories are watched with inotify (through ctypes, no extra
+package needed); elsewhere, or if inotify is unavailable, the watcher simply
+wakes up every few seconds. Either way the caller re-checks the files it
+cares about after each wake-up, so a spurious or missed event only costs a
+``stat`` per file. Bursts of events are debounced into one wake-up.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from batch import is_results_file
+
+# Quiet time that ends a burst of changes
+DEBOUNCE_SECONDS = 0.5
+# A file written continuously still triggers a wake-up this often
+MAX_DELAY_SECONDS = 5.0
+# Wake-up interval without inotify
+POLL_INTERVAL_SECONDS = 2.0
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+               | IN_CREATE | IN_DELETE)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def watch_roots(patterns: Iterable[str]) -> List[Tuple[Path, bool]]:
+    """Directories to watch for the CLI *patterns*, as ``(path, recursive)``"""
+    roots = []
+    for pattern in patterns:
+        path = Path(pattern)
+        if any(ch in pattern for ch in '*?['):
+            # Watch below the part of the pattern without wildcards
+            parts = []
+            for part in path.parts:
+                if any(ch in part for ch in '*?['):
+                    break
+                parts.append(part)
+            roots.append((Path(*parts) if parts else Path('.'), True))
+        elif path.is_dir():
+            roots.append((path, True))
+        else:
+            roots.append((path.parent, False))
+    return roots
+
+
+class PollingWatcher:
+    """Fallback watcher: reports a possible change every *interval* seconds"""
+
+    name = "polling"
+
+    def __init__(self, interval: float = POLL_INTERVAL_SECONDS):
+        self.interval = interval
+
+    def wait(self) -> None:
+        time.sleep(self.interval)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify watcher over a set of directories.
+
+    Only events about results files (see ``batch.is_results_file``) and new
+    directories wake the caller, so viewers written next to their inputs do
+    not trigger another round.
+    """
+
+    name = "inotify"
+
+    def __init__(self, roots: List[Tuple[Path, bool]],
+                 debounce: float = DEBOUNCE_SECONDS, max_delay: float = MAX_DELAY_SECONDS):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch descriptor -> (directory, recursive)
+        self._watches: Dict[int, Tuple[Path, bool]] = {}
+        try:
+            for root, recursive in roots:
+                self._add(root, recursive)
+        except OSError:
+            self.close()
+            raise
+
+    def _add(self, directory: Path, recursive: bool) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Cannot watch {directory}: {os.strerror(errno)}")
+        self._watches[wd] = (directory, recursive)
+        if recursive:
+            for child in directory.iterdir():
+                if child.is_dir() and not child.is_symlink():
+                    self._add(child, True)
+
+    def _read_events(self, timeout: Optional[float]) -> bool:
+        """Wait up to *timeout* seconds; True if a relevant event arrived"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        relevant = False
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                relevant = True
+                continue
+            directory, recursive = self._watches.get(wd, (None, False))
+            if directory is None:
+                continue
+            if mask & IN_ISDIR:
+                if recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._add(directory / name, True)
+                    except OSError:
+                        pass  # already gone again
+                relevant = True
+            elif is_results_file(Path(name)):
+                relevant = True
+        return relevant
+
+    def wait(self) -> None:
+        """Block until a results file changed and the burst has settled"""
+        while not self._read_events(None):
+            pass
+        first = time.monotonic()
+        while time.monotonic() - first < self.max_delay:
+            if not self._read_events(self.debounce):
+                break
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def open_watcher(patterns: Iterable[str], debounce: float = DEBOUNCE_SECONDS):
+    """An inotify watcher for *patterns* where possible, else a polling one"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(watch_roots(patterns), debounce)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher()
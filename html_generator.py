@@ -4,70 +4,110 @@ HTML Generator Module
 Handles generation of HTML structure for the Red Hat certification viewer.
 """
 
-from typing import List, Dict
-
-
-def generate_sidebar_html(tests: List[Dict]) -> str:
-    """Generate the sidebar navigation HTML"""
-    sidebar_content = '''
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from profiling import StageProfiler, profile_stage
+from xml_parser import copy_results
+
+# Target size of the encoded chunks written to the output file
+CHUNK_SIZE = 64 * 1024
+
+
+def _json_for_script(value) -> str:
+    """Compact JSON that is safe to place inside a ``<script>`` element"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('<', '\\u003c')
+
+
+def _nav_test_entry(test: Dict) -> list:
+    """Compact per-test entry of the navigator data island.
+
+    ``[name, status, passed, numbers, texts, failed, ordinals]`` where
+    *numbers* and *texts* are per-command columns, *failed* lists the indexes
+    of commands with a non-zero return value and *ordinals* gives each
+    command's position among the document's ``<command>`` elements, delta
+    encoded (first value absolute) since they are mostly consecutive.
+    """
+    commands = test['commands']
+    ordinals = []
+    previous = 0
+    for cmd in commands:
+        ordinals.append(cmd.ordinal - previous)
+        previous = cmd.ordinal
+    return [
+        test['name'],
+        test['status'],
+        test['passed_commands'],
+        [cmd['number'] for cmd in commands],
+        [cmd['text'] for cmd in commands],
+        [i for i, cmd in enumerate(commands) if cmd['status'] != 'PASS'],
+        ordinals,
+    ]
+
+
+def iter_sidebar_html(tests: List[Dict], search_index: Optional[Dict] = None,
+                      failure_marks: Optional[List[Tuple[str, int]]] = None) -> Iterator[str]:
+    """Yield the sidebar navigation HTML fragment by fragment.
+
+    Only the navigator shell is HTML; tests and commands go into a JSON data
+    island that the viewer script renders with virtual scrolling, so the
+    page's DOM size does not grow with the number of commands. When given,
+    *search_index* (see ``search_index.build_search_index``) is emitted as a
+    second island used by the search box.
+
+    A third island (``#nav-failures``) lists the tests with failing commands
+    and the document-ordered *failure_marks* (``ResultsDocument.failure_marks``)
+    used by Show Failures and next/previous failure navigation.
+    """
+    yield '''
     <div class="nav-header">
         <div class="nav-title">Test Navigator</div>
         <div class="nav-controls">
             <button class="nav-btn" onclick="jumpToTop()">Top</button>
-            <button class="nav-btn" id="failedToggle" onclick="toggleFailed()">Show Failures</button>
+            <button class="nav-btn" id="failedToggle" onclick="toggleFailed()" title="Press n / p to jump to the next / previous failure">Show Failures</button>
             <input type="text" class="nav-search" placeholder="Search tests/commands..." oninput="filterTests()">
         </div>
     </div>
 
-    <div class="nav-content">'''
+    <div class="nav-content" id="navContent">
+        <div class="nav-rows" id="navRows"></div>
+    </div>
+    <script type="application/json" id="nav-data">['''
 
+    failed_tests = []
     for i, test in enumerate(tests):
-        status_class = f"status-{test['status'].lower()}"
-        test_id = f"test_{i}"
-
-        sidebar_content += f'''
-        <div class="test-item">
-            <div class="test-header {status_class}" onclick="toggleTest('{test_id}')">
-                <div class="test-info">
-                    <div class="test-name">{test['name']}</div>
-                    <div class="test-stats">✓ {test['passed_commands']}/{test['total_commands']} commands</div>
-                </div>
-                <span class="test-toggle">▼</span>
-            </div>
-            <div class="command-list" id="nav_{test_id}">'''
-
-        for cmd in test['commands']:
-            status_icon = '✓' if cmd['status'] == 'PASS' else '✗'
-            status_class = 'cmd-success' if cmd['status'] == 'PASS' else 'cmd-error'
-
-            sidebar_content += f'''
-                <div class="command-item" onclick="jumpToCommand('{cmd['text']}')">
-                    <span class="cmd-number">#{cmd['number']}</span>
-                    <span class="cmd-status {status_class}">{status_icon}</span>
-                    <span class="cmd-text">{cmd['text'][:50]}...</span>
-                </div>'''
-
-        sidebar_content += '''
-            </div>
-        </div>'''
-
-    sidebar_content += '''
-    </div>'''
-
-    return sidebar_content
-
-
-def generate_complete_html(xml_file_path: str, css_filename: str, js_filename: str,
-                          tests: List[Dict], xml_attributes: Dict[str, str]) -> str:
-    """Generate the complete HTML document"""
-
-    sidebar_html = generate_sidebar_html(tests)
+        entry = _nav_test_entry(test)
+        if entry[5]:
+            failed_tests.append(i)
+        yield (',' if i else '') + _json_for_script(entry)
+
+    yield ''']</script>'''
+
+    marks = failure_marks or []
+    failures = {
+        't': failed_tests,
+        'k': ''.join(kind for kind, _ in marks),
+        'o': [ordinal for _, ordinal in marks],
+    }
+    yield f'''
+    <script type="application/json" id="nav-failures">{_json_for_script(failures)}</script>'''
+
+    if search_index is not None:
+        yield '''
+    <script type="application/json" id="nav-search">'''
+        yield _json_for_script(search_index)
+        yield '''</script>'''
+
+
+def generate_sidebar_html(tests: List[Dict], search_index: Optional[Dict] = None,
+                          failure_marks: Optional[List[Tuple[str, int]]] = None) -> str:
+    """Generate the sidebar navigation HTML"""
+    return ''.join(iter_sidebar_html(tests, search_index, failure_marks))
 
-    # Read the original XML content
-    with open(xml_file_path, 'r', encoding='utf-8') as f:
-        xml_content = f.read()
 
-    html_content = f'''<!DOCTYPE html>
+def _page_head(css_filename: str) -> str:
+    """HTML from the doctype up to the sidebar contents"""
+    return f'''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -84,7 +124,12 @@ def generate_complete_html(xml_file_path: str, css_filename: str, js_filename: s
     <!-- Navigation Sidebar -->
     <div class="nav-sidebar" id="sidebar">
         <div class="sidebar-resizer" id="resizer"></div>
-        {sidebar_html}
+        '''
+
+
+def _page_middle() -> str:
+    """HTML between the sidebar and the embedded XML"""
+    return '''
     </div>
 
     <!-- Sidebar Toggle Button -->
@@ -92,26 +137,56 @@ def generate_complete_html(xml_file_path: str, css_filename: str, js_filename: s
 
     <!-- Main Content -->
     <div class="main-content">
-        {xml_content}
+        '''
+
+
+def _page_tail(js_filename: str) -> str:
+    """HTML after the embedded XML"""
+    return f'''
     </div>
 
     <script src="{js_filename}"></script>
 </body>
 </html>'''
 
-    return html_content
+
+def _encoded_batches(fragments: Iterable[str]) -> Iterator[bytes]:
+    """Join small text fragments into UTF-8 chunks of about ``CHUNK_SIZE``"""
+    batch: List[str] = []
+    size = 0
+    for fragment in fragments:
+        batch.append(fragment)
+        size += len(fragment)
+        if size >= CHUNK_SIZE:
+            yield ''.join(batch).encode('utf-8')
+            batch.clear()
+            size = 0
+    if batch:
+        yield ''.join(batch).encode('utf-8')
+
+
+def _iter_html_prefix(css_filename: str, tests: List[Dict], search_index: Optional[Dict],
+                      failure_marks: Optional[List[Tuple[str, int]]]) -> Iterator[bytes]:
+    """Yield everything that precedes the embedded XML"""
+    yield _page_head(css_filename).encode('utf-8')
+    yield from _encoded_batches(iter_sidebar_html(tests, search_index, failure_marks))
+    yield _page_middle().encode('utf-8')
 
 
 def create_html_file(xml_file_path: str, css_filename: str, js_filename: str,
                     tests: List[Dict], xml_attributes: Dict[str, str],
-                    output_filename: str) -> str:
+                    output_filename: str, search_index: Optional[Dict] = None,
+                    failure_marks: Optional[List[Tuple[str, int]]] = None,
+                    profiler: Optional[StageProfiler] = None) -> str:
     """Create HTML file and return filename"""
 
-    html_content = generate_complete_html(
-        xml_file_path, css_filename, js_filename, tests, xml_attributes
-    )
-
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    with open(output_filename, 'wb') as f:
+        with profile_stage(profiler, 'sidebar'):
+            for chunk in _iter_html_prefix(css_filename, tests, search_index, failure_marks):
+                f.write(chunk)
+        # The original XML goes in verbatim: copied file-to-file, never decoded
+        with profile_stage(profiler, 'embed_xml'):
+            copy_results(xml_file_path, f)
+        f.write(_page_tail(js_filename).encode('utf-8'))
 
-    return output_filename
\ No newline at end of file
+    return output_filename
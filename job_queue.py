@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Job Queue for RHCert XML Viewer
+-------------------------------
+Runs viewer generation in the background so an upload returns immediately
+with a job ID. Job state and progress live in a small SQLite database shared
+by every server process (gunicorn workers included), so any worker can answer
+a status request; conversions run in a bounded process pool owned by the
+process that accepted the upload. No external broker is required.
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from profiling import StageProfiler
+from viewer_generator import create_viewer
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED_STATES = (DONE, FAILED)
+
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id       TEXT PRIMARY KEY,
+    key      TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    state    TEXT NOT NULL,
+    stage    TEXT,
+    parse    REAL NOT NULL DEFAULT 0,
+    render   REAL NOT NULL DEFAULT 0,
+    error    TEXT,
+    profile  TEXT,
+    input    TEXT,
+    owner    INTEGER NOT NULL,
+    created  REAL NOT NULL,
+    updated  REAL NOT NULL
+);
+-- At most one unfinished job per upload digest, across all processes
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_key
+    ON jobs (key) WHERE state IN ('queued', 'running');
+"""
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """Job records in a SQLite database (one short-lived connection per call)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column in ("profile", "input"):
+                if column not in columns:
+                    try:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+                    except sqlite3.OperationalError:
+                        pass  # added by another process meanwhile
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, key: str, filename: str, state: str = QUEUED,
+               input_path: Optional[str] = None) -> Tuple[Dict, bool]:
+        """Add a job for the upload with digest *key*, read from *input_path*.
+
+        Returns ``(job, created)``; if a job for *key* is already queued or
+        running, that job is returned instead with ``created`` false.
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE state IN (?, ?) AND updated < ?",
+                         (DONE, FAILED, now - JOB_RETENTION_SECONDS))
+            try:
+                conn.execute(
+                    "INSERT INTO jobs (id, key, filename, state, input, owner, created, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, key, filename, state, input_path, os.getpid(), now, now))
+            except sqlite3.IntegrityError:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE key = ? AND state IN (?, ?)",
+                    (key, QUEUED, RUNNING)).fetchone()
+                if row is not None:
+                    return dict(row), False
+                raise
+        return self.get(job_id), True
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return the job as a dict, or ``None`` if it is unknown"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job["state"] not in FINISHED_STATES and not _process_alive(job["owner"]):
+            # The server process that owned the pool went away mid-job
+            job.update(state=FAILED, error="Interrupted: the server process running this job exited.")
+            self.update(job_id, state=FAILED, error=job["error"])
+        return job
+
+    def active_inputs(self) -> Set[str]:
+        """Input files of the jobs still queued or running in a live process"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT input, owner FROM jobs WHERE state IN (?, ?) AND input IS NOT NULL",
+                (QUEUED, RUNNING)).fetchall()
+        return {row["input"] for row in rows if _process_alive(row["owner"])}
+
+    def update(self, job_id: str, **fields) -> None:
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _run_job(db_path: str, job_id: str, xml_path: str, output_dir: str,
+             asset_dir: Optional[str], profile: bool, pstats_dir: Optional[str]) -> bool:
+    """Pool worker: generate the viewer, recording progress in the job store"""
+    store = JobStore(db_path)
+    store.update(job_id, state=RUNNING, stage="parse")
+
+    def progress(stage: str, fraction: float) -> None:
+        store.update(job_id, stage=stage, **{stage: fraction})
+
+    if not profile:
+        return create_viewer(xml_path, output_dir=output_dir, progress=progress,
+                             precompress=True, asset_dir=asset_dir)
+
+    pstats_path = os.path.join(pstats_dir, f"{job_id}.pstats") if pstats_dir else None
+    profiler = StageProfiler(pstats_path=pstats_path)
+    with profiler.run():
+        success = create_viewer(xml_path, output_dir=output_dir, progress=progress,
+                                precompress=True, asset_dir=asset_dir, profiler=profiler)
+    store.update(job_id, profile=json.dumps(profiler.to_dict()))
+    return success
+
+
+class JobQueue:
+    """Bounded process pool feeding a ``JobStore``.
+
+    The pool is started on first use, i.e. after gunicorn has forked its
+    workers, and uses the ``spawn`` start method so children never inherit
+    a multi-threaded server process. With *profile*, every job records a
+    stage profile (see ``profiling``) in the store, and cProfile statistics
+    are written to *pstats_dir* as ``<job id>.pstats`` if it is given.
+    """
+
+    def __init__(self, store: JobStore, max_workers: int, profile: bool = False,
+                 pstats_dir: Optional[str] = None):
+        self.store = store
+        self.max_workers = max_workers
+        self.profile = profile
+        self.pstats_dir = pstats_dir
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, filename: str, xml_path: str, output_dir: str,
+               on_finished: Callable[[bool], None],
+               asset_dir: Optional[str] = None) -> Tuple[Dict, bool]:
+        """Queue conversion of *xml_path* into *output_dir*, with the shared
+        CSS/JS going to *asset_dir* (see ``create_viewer``).
+
+        *on_finished* is called in this process with the outcome before the
+        job is marked done, e.g. to commit the output to the result cache.
+        Returns ``(job, created)``: if *key* is already being converted, that
+        job is returned with ``created`` false and nothing is queued.
+        """
+        job, created = self.store.create(key, filename, input_path=xml_path)
+        if not created:
+            return job, False
+
+        try:
+            future = self._pool().submit(_run_job, self.store.path, job["id"], xml_path,
+                                         output_dir, asset_dir, self.profile, self.pstats_dir)
+        except Exception as e:
+            # Never leave a queued job behind that no pool will pick up
+            self.store.update(job["id"], state=FAILED, error=f"Could not queue job: {e}")
+            raise
+        future.add_done_callback(lambda f: self._finish(job["id"], f, on_finished))
+        return job, True
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _finish(self, job_id: str, future: Future, on_finished: Callable[[bool], None]) -> None:
+        error = None
+        try:
+            success = future.result()
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            success, error = False, "The conversion process crashed."
+        except Exception as e:
+            success, error = False, f"Error creating viewer: {e}"
+        if not success and error is None:
+            error = "Failed to generate viewer from the uploaded XML file."
+
+        try:
+            on_finished(success)
+        except Exception as e:
+            success, error = False, f"Error storing viewer: {e}"
+
+        self.store.update(job_id, state=DONE if success else FAILED, error=error)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -4,6 +4,8 @@ JavaScript Generator Module
 Handles generation of JavaScript functionality for the Red Hat certification viewer.
 """
 
+from static_assets import asset_filename, write_asset
+
 
 def generate_js_content() -> str:
     """Generate the complete JavaScript content for the viewer"""
@@ -14,11 +16,42 @@ let isDragging = false;
 let sidebarCollapsed = false;
 let showOnlyFailed = false;
 
+// Virtualized navigator state. navTests comes from the #nav-data JSON island:
+// one [name, status, passed, numbers, texts, failed, ordinals] entry per test.
+const TEST_ROW_HEIGHT = 42;
+const TEST_ROW_GAP = 6;
+const CMD_ROW_HEIGHT = 22;
+const ROW_OVERSCAN = 10;
+
+let navTests = [];
+let navExpanded = new Uint8Array(0);
+let navMatches = null;      // Uint8Array of search hits per test, or null when not searching
+let navRowTest = new Int32Array(0);
+let navRowCmd = new Int32Array(0);   // -1 for test header rows
+let navRowTop = new Float64Array(1);
+let navRenderPending = false;
+
+// <command> elements in document order; a command's ordinal indexes straight
+// into this live collection, so jumping never scans the page.
+let commandAnchors = null;
+let navOrdinals = [];       // decoded ordinals per test, filled on first use
+let highlightedCommand = null;
+
+// Failure index from the #nav-failures island: the tests with failing commands
+// and every FAIL/WARN <message> ('m') and failing <command> ('c') in document
+// order, addressed by ordinal within their tag.
+let navFailedTests = [];
+let failureKinds = '';
+let failureOrdinals = [];
+let failureCursor = -1;
+let messageAnchors = null;
+
 // Initialize sidebar functionality
 document.addEventListener('DOMContentLoaded', function() {
     initializeResizer();
+    initializeNavigator();
     updateMainContentMargin();
-    // attach keyboard shortcut? none
+    document.addEventListener('keydown', onFailureKey);
 });
 
 function initializeResizer() {
@@ -87,126 +120,448 @@ function toggleSidebar() {
     updateMainContentMargin();
 }
 
-function toggleTest(testId) {
-    const commandList = document.getElementById('nav_' + testId);
-    const header = event.target.closest('.test-header');
-    const toggle = header.querySelector('.test-toggle');
+function initializeNavigator() {
+    const island = document.getElementById('nav-data');
+    navTests = island ? JSON.parse(island.textContent) : [];
+    navExpanded = new Uint8Array(navTests.length);
+
+    const failures = document.getElementById('nav-failures');
+    if (failures) {
+        const index = JSON.parse(failures.textContent);
+        navFailedTests = index.t;
+        failureKinds = index.k;
+        failureOrdinals = index.o;
+    }
+
+    const content = document.getElementById('navContent');
+    if (!content) return;
+    content.addEventListener('click', onNavClick);
+    document.getElementById('sidebar').addEventListener('scroll', scheduleNavRender, { passive: true });
+    window.addEventListener('resize', scheduleNavRender);
+
+    rebuildNavRows();
+    jumpToLocationHash();
+}
+
+function testIsShown(t) {
+    return !navMatches || navMatches[t] === 1;
+}
+
+// Flatten the visible tests (and commands of expanded tests) into rows and
+// precompute their offsets; only the rows on screen are ever turned into DOM.
+// With Show Failures on, only the precomputed failing tests are visited.
+function rebuildNavRows() {
+    const rowTest = [];
+    const rowCmd = [];
+    const count = showOnlyFailed ? navFailedTests.length : navTests.length;
+
+    for (let i = 0; i < count; i++) {
+        const t = showOnlyFailed ? navFailedTests[i] : i;
+        if (!testIsShown(t)) continue;
+        rowTest.push(t);
+        rowCmd.push(-1);
+        if (!navExpanded[t]) continue;
+
+        if (showOnlyFailed) {
+            for (const c of navTests[t][5]) {
+                rowTest.push(t);
+                rowCmd.push(c);
+            }
+        } else {
+            const commands = navTests[t][3].length;
+            for (let c = 0; c < commands; c++) {
+                rowTest.push(t);
+                rowCmd.push(c);
+            }
+        }
+    }
+
+    navRowTest = Int32Array.from(rowTest);
+    navRowCmd = Int32Array.from(rowCmd);
+    navRowTop = new Float64Array(navRowTest.length + 1);
+    for (let r = 0; r < navRowTest.length; r++) {
+        const height = navRowCmd[r] < 0 ? TEST_ROW_HEIGHT + TEST_ROW_GAP : CMD_ROW_HEIGHT;
+        navRowTop[r + 1] = navRowTop[r] + height;
+    }
+
+    document.getElementById('navRows').style.height = navRowTop[navRowTest.length] + 'px';
+    renderNavRows();
+}
+
+function scheduleNavRender() {
+    if (navRenderPending) return;
+    navRenderPending = true;
+    requestAnimationFrame(renderNavRows);
+}
+
+// Index of the row covering vertical offset y (binary search over navRowTop)
+function findNavRow(y) {
+    let lo = 0;
+    let hi = navRowTest.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (navRowTop[mid + 1] <= y) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+}
+
+function renderNavRows() {
+    navRenderPending = false;
+    const sidebar = document.getElementById('sidebar');
+    const layer = document.getElementById('navRows');
+    if (!layer) return;
+
+    const viewTop = sidebar.scrollTop - layer.offsetTop;
+    const first = Math.max(0, findNavRow(viewTop) - ROW_OVERSCAN);
+    const last = Math.min(navRowTest.length, findNavRow(viewTop + sidebar.clientHeight) + ROW_OVERSCAN + 1);
+
+    const fragment = document.createDocumentFragment();
+    for (let r = first; r < last; r++) {
+        fragment.appendChild(createNavRow(r));
+    }
+    layer.replaceChildren(fragment);
+}
+
+function createNavElement(tag, className, text) {
+    const el = document.createElement(tag);
+    el.className = className;
+    if (text !== undefined) el.textContent = text;
+    return el;
+}
+
+function createNavRow(r) {
+    const t = navRowTest[r];
+    const c = navRowCmd[r];
+    const test = navTests[t];
+    let row;
+
+    if (c < 0) {
+        row = createNavElement('div', 'test-item nav-row');
+        row.style.height = TEST_ROW_HEIGHT + 'px';
+        const header = createNavElement('div', 'test-header status-' + String(test[1]).toLowerCase());
+        const info = createNavElement('div', 'test-info');
+        info.appendChild(createNavElement('div', 'test-name', test[0]));
+        info.appendChild(createNavElement('div', 'test-stats', '✓ ' + test[2] + '/' + test[3].length + ' commands'));
+        header.appendChild(info);
+        header.appendChild(createNavElement('span', 'test-toggle', navExpanded[t] ? '▲' : '▼'));
+        header.title = test[0];
+        row.appendChild(header);
+    } else {
+        const failed = test[5].indexOf(c) !== -1;
+        row = createNavElement('div', 'command-item nav-row');
+        row.style.height = CMD_ROW_HEIGHT + 'px';
+        row.appendChild(createNavElement('span', 'cmd-number', '#' + test[3][c]));
+        row.appendChild(createNavElement('span', 'cmd-status ' + (failed ? 'cmd-error' : 'cmd-success'), failed ? '✗' : '✓'));
+        row.appendChild(createNavElement('span', 'cmd-text', test[4][c]));
+        row.title = test[4][c];
+    }
+
+    row.style.top = navRowTop[r] + 'px';
+    row.dataset.row = r;
+    return row;
+}
 
-    if (commandList.classList.contains('expanded')) {
-        commandList.classList.remove('expanded');
-        toggle.textContent = '▼';
+function onNavClick(e) {
+    const row = e.target.closest('.nav-row');
+    if (!row) return;
+    const r = Number(row.dataset.row);
+    const t = navRowTest[r];
+    const c = navRowCmd[r];
+
+    if (c < 0) {
+        toggleTest(t);
     } else {
-        commandList.classList.add('expanded');
-        toggle.textContent = '▲';
+        jumpToCommand(t, c, row);
+    }
+}
+
+function toggleTest(testIndex) {
+    navExpanded[testIndex] = navExpanded[testIndex] ? 0 : 1;
+    rebuildNavRows();
+}
+
+// Document ordinal of command c of test t (ordinals are delta encoded)
+function commandOrdinal(t, c) {
+    let ordinals = navOrdinals[t];
+    if (!ordinals) {
+        const deltas = navTests[t][6];
+        ordinals = new Int32Array(deltas.length);
+        let value = 0;
+        for (let i = 0; i < deltas.length; i++) {
+            value += deltas[i];
+            ordinals[i] = value;
+        }
+        navOrdinals[t] = ordinals;
     }
+    return ordinals[c];
+}
+
+function commandElement(t, c) {
+    if (!commandAnchors) commandAnchors = document.getElementsByTagName('command');
+    return commandAnchors[commandOrdinal(t, c)] || null;
 }
 
-function jumpToCommand(commandText) {
+function jumpToCommand(testIndex, cmdIndex, clickedItem) {
     // Add click animation to sidebar item
-    const clickedItem = event.target.closest('.command-item');
     if (clickedItem) {
         clickedItem.classList.add('clicked');
         setTimeout(() => clickedItem.classList.remove('clicked'), 600);
     }
 
-    // Remove existing highlights
-    document.querySelectorAll('.highlight').forEach(el => el.classList.remove('highlight'));
+    const cmd = commandElement(testIndex, cmdIndex);
+    if (!cmd) return;
+
+    // Remove the previous highlight
+    if (highlightedCommand) highlightedCommand.classList.remove('highlight');
+    highlightedCommand = cmd;
+
+    // Highlight the specific command with enhanced animation
+    cmd.classList.add('highlight');
+
+    // Scroll to command with better positioning
+    const rect = cmd.getBoundingClientRect();
+    const offset = window.innerHeight / 3; // Show command in upper third of screen
+    window.scrollTo({
+        top: window.pageYOffset + rect.top - offset,
+        behavior: 'smooth'
+    });
+
+    // Remove highlight after animation
+    setTimeout(() => cmd.classList.remove('highlight'), 3000);
+
+    // Stable, shareable link: #cmd-<test index>-<command number>
+    if (window.history && history.replaceState) {
+        history.replaceState(null, '', '#cmd-' + testIndex + '-' + navTests[testIndex][3][cmdIndex]);
+    }
+}
 
-    // Find the exact command element in original XML
-    const commands = document.querySelectorAll('command');
-    let commandFound = false;
+function jumpToLocationHash() {
+    const match = window.location && /^#cmd-(\\d+)-(\\d+)$/.exec(window.location.hash);
+    if (!match) return;
+    const t = Number(match[1]);
+    if (t >= navTests.length) return;
+    const c = navTests[t][3].indexOf(Number(match[2]));
+    if (c !== -1) jumpToCommand(t, c, null);
+}
 
-    for (let cmd of commands) {
-        if (cmd.getAttribute('command') === commandText) {
-            // Highlight the specific command with enhanced animation
-            cmd.classList.add('highlight');
+function jumpToTop() {
+    document.querySelector('certification-test').scrollIntoView({ behavior: 'smooth' });
+}
 
-            // Scroll to command with better positioning
-            const rect = cmd.getBoundingClientRect();
-            const offset = window.innerHeight / 3; // Show command in upper third of screen
-            window.scrollTo({
-                top: window.pageYOffset + rect.top - offset,
-                behavior: 'smooth'
-            });
+// ---------------------------------------------------------------------------
+// Search: a trigram index (#nav-search island) built at generation time narrows
+// each query to candidate tests, which are then verified against their text.
+// Lookups run in a Web Worker when possible so typing never blocks the page.
+// ---------------------------------------------------------------------------
+
+const SEARCH_DEBOUNCE_MS = 120;
+
+let searchTimer = null;
+let searchWorker = null;
+let searchSeq = 0;
+let searchTerm = '';
+let localSearch = null;
+
+// Shared by the worker and the main-thread fallback, so it must only use its
+// arguments (it is serialized into the worker source with toString()).
+function createSearcher(navJson, indexJson) {
+    const tests = JSON.parse(navJson);
+    const index = indexJson ? JSON.parse(indexJson) : { g: {}, s: [], d: [] };
+    const postings = index.g;
+    const stopGrams = new Set(index.s);
+    const hasOwn = Object.prototype.hasOwnProperty;
+    const useIndex = !!indexJson;
+
+    const haystacks = tests.map((test, t) => {
+        const details = index.d[t] || ['', ''];
+        return [test[0], details[0], details[1]].concat(test[4]).join('\\n').toLowerCase();
+    });
 
-            // Remove highlight after animation
-            setTimeout(() => cmd.classList.remove('highlight'), 3000);
-            commandFound = true;
-            break;
+    function decode(deltas) {
+        const ids = new Array(deltas.length);
+        let value = 0;
+        for (let i = 0; i < deltas.length; i++) {
+            value += deltas[i];
+            ids[i] = value;
         }
+        return ids;
     }
 
-    // If exact match not found, try partial matching
-    if (!commandFound) {
-        for (let cmd of commands) {
-            const cmdAttr = cmd.getAttribute('command') || '';
-            if (cmdAttr.includes(commandText.split(' ')[0])) {
-                cmd.classList.add('highlight');
+    function intersect(a, b) {
+        const out = [];
+        let i = 0;
+        let j = 0;
+        while (i < a.length && j < b.length) {
+            if (a[i] === b[j]) { out.push(a[i]); i++; j++; }
+            else if (a[i] < b[j]) i++;
+            else j++;
+        }
+        return out;
+    }
 
-                const rect = cmd.getBoundingClientRect();
-                const offset = window.innerHeight / 3;
-                window.scrollTo({
-                    top: window.pageYOffset + rect.top - offset,
-                    behavior: 'smooth'
-                });
+    // Candidate tests for term, or null when the index cannot narrow it down
+    function candidates(term) {
+        // Short terms have no trigrams; astral characters are counted
+        // differently by the Python indexer, so scan in both cases.
+        if (!useIndex || term.length < 3 || /[\\uD800-\\uDFFF]/.test(term)) return null;
+        let result = null;
+        for (let i = 0; i + 3 <= term.length; i++) {
+            const gram = term.substr(i, 3);
+            if (stopGrams.has(gram)) continue;
+            if (!hasOwn.call(postings, gram)) return [];
+            result = result ? intersect(result, decode(postings[gram])) : decode(postings[gram]);
+            if (result.length === 0) return result;
+        }
+        return result;
+    }
 
-                setTimeout(() => cmd.classList.remove('highlight'), 3000);
-                break;
+    return function search(term) {
+        const matches = [];
+        const pool = candidates(term);
+        if (pool) {
+            for (const t of pool) {
+                if (haystacks[t].includes(term)) matches.push(t);
+            }
+        } else {
+            for (let t = 0; t < haystacks.length; t++) {
+                if (haystacks[t].includes(term)) matches.push(t);
             }
         }
+        return matches;
+    };
+}
+
+function searchIslands() {
+    const nav = document.getElementById('nav-data');
+    const index = document.getElementById('nav-search');
+    return [nav ? nav.textContent : '[]', index ? index.textContent : null];
+}
+
+function startSearchWorker() {
+    if (searchWorker !== null || typeof Worker === 'undefined' || typeof Blob === 'undefined') return;
+    try {
+        const source = 'const createSearcher = ' + createSearcher.toString() + ';\\n' +
+            'let search = null;\\n' +
+            'onmessage = function(e) {\\n' +
+            '    if (e.data.init) { search = createSearcher(e.data.init[0], e.data.init[1]); return; }\\n' +
+            '    postMessage({ seq: e.data.seq, matches: search(e.data.term) });\\n' +
+            '};\\n';
+        const url = URL.createObjectURL(new Blob([source], { type: 'text/javascript' }));
+        searchWorker = new Worker(url);
+        searchWorker.onmessage = e => {
+            if (e.data.seq === searchSeq) applySearchResult(e.data.matches);
+        };
+        searchWorker.onerror = () => {
+            // e.g. workers blocked for this origin: search on the main thread
+            searchWorker = false;
+            runSearch(searchTerm);
+        };
+        searchWorker.postMessage({ init: searchIslands() });
+    } catch (err) {
+        searchWorker = false;
     }
 }
 
-function jumpToTop() {
-    document.querySelector('certification-test').scrollIntoView({ behavior: 'smooth' });
+function applySearchResult(matches) {
+    if (matches === null) {
+        navMatches = null;
+    } else {
+        navMatches = new Uint8Array(navTests.length);
+        for (const t of matches) navMatches[t] = 1;
+    }
+    rebuildNavRows();
 }
 
-function filterTests() {
-    const searchTerm = event.target.value.toLowerCase();
-    const testItems = document.querySelectorAll('.test-item');
+function runSearch(term) {
+    searchSeq++;
+    searchTerm = term;
+    if (term === '') {
+        applySearchResult(null);
+        return;
+    }
 
-    testItems.forEach(item => {
-        const testText = item.textContent.toLowerCase();
-        if (testText.includes(searchTerm) || searchTerm === '') {
-            item.style.display = 'block';
-        } else {
-            item.style.display = 'none';
-        }
-    });
+    startSearchWorker();
+    if (searchWorker) {
+        searchWorker.postMessage({ seq: searchSeq, term: term });
+        return;
+    }
+
+    if (!localSearch) {
+        const islands = searchIslands();
+        localSearch = createSearcher(islands[0], islands[1]);
+    }
+    applySearchResult(localSearch(term));
+}
+
+function filterTests() {
+    const term = event.target.value.toLowerCase();
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => runSearch(term), SEARCH_DEBOUNCE_MS);
 }
 
 function toggleFailed() {
     showOnlyFailed = !showOnlyFailed;
+    document.getElementById('sidebar').classList.toggle('only-failures', showOnlyFailed);
     const btn = document.getElementById('failedToggle');
     btn.textContent = showOnlyFailed ? 'Show All' : 'Show Failures';
     applyFailureFilter();
 }
 
 function applyFailureFilter() {
-    const commandItems = document.querySelectorAll('.command-item');
-    commandItems.forEach(item => {
-        const isPass = item.querySelector('.cmd-status')?.classList.contains('cmd-success');
-        if (showOnlyFailed && isPass) {
-            item.style.display = 'none';
-        } else {
-            item.style.display = 'flex';
-        }
-    });
+    // Passing commands and tests without failures drop out of the row model
+    rebuildNavRows();
+}
+
+// ---------------------------------------------------------------------------
+// Next / previous failure: 'n' and 'p' step through the failure index
+// ---------------------------------------------------------------------------
+
+function failureElement(i) {
+    if (failureKinds[i] === 'm') {
+        if (!messageAnchors) messageAnchors = document.getElementsByTagName('message');
+        return messageAnchors[failureOrdinals[i]] || null;
+    }
+    if (!commandAnchors) commandAnchors = document.getElementsByTagName('command');
+    return commandAnchors[failureOrdinals[i]] || null;
+}
+
+function nextFailure(direction) {
+    const total = failureOrdinals.length;
+    if (total === 0) return;
+    failureCursor = failureCursor < 0 && direction < 0
+        ? total - 1
+        : (failureCursor + direction + total) % total;
+
+    const target = failureElement(failureCursor);
+    if (!target) return;
 
-    // Hide entire tests that now have no visible commands
-    const testItems = document.querySelectorAll('.test-item');
-    testItems.forEach(test => {
-        const anyVisible = test.querySelectorAll('.command-item').length && Array.from(test.querySelectorAll('.command-item')).some(ci => ci.style.display !== 'none');
-        test.style.display = anyVisible ? 'block' : 'none';
+    if (highlightedCommand) highlightedCommand.classList.remove('highlight');
+    highlightedCommand = target;
+    target.classList.add('highlight');
+
+    const rect = target.getBoundingClientRect();
+    window.scrollTo({
+        top: window.pageYOffset + rect.top - window.innerHeight / 3,
+        behavior: 'smooth'
     });
+}
+
+function onFailureKey(e) {
+    if (e.ctrlKey || e.metaKey || e.altKey) return;
+    const tag = e.target && e.target.tagName;
+    if (tag === 'INPUT' || tag === 'TEXTAREA') return;
+    if (e.key === 'n') nextFailure(1);
+    else if (e.key === 'p') nextFailure(-1);
 }'''
 
 
-def create_js_file(base_name: str) -> str:
-    """Create JavaScript file and return filename"""
-    js_filename = f"{base_name}-script.js"
+def js_asset_filename() -> str:
+    """Content-hashed filename of the shared JavaScript file"""
+    return asset_filename(generate_js_content(), 'js')
 
-    with open(js_filename, 'w', encoding='utf-8') as f:
-        f.write(generate_js_content())
 
-    return js_filename
\ No newline at end of file
+def create_js_file(output_dir: str = '.') -> str:
+    """Create the shared JavaScript file in *output_dir* unless present and return its filename"""
+    js_filename = js_asset_filename()
+    write_asset(output_dir, js_filename, generate_js_content())
+    return js_filename
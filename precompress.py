@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Precompress Module
+Writes compressed copies of generated files next to them (``.gz``, plus
+``.br`` when the brotli package is installed), so a web server can send them
+with a ``Content-Encoding`` instead of compressing on every request.
+"""
+
+import gzip
+import os
+from typing import List, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+# (Content-Encoding, file suffix), most preferred first
+ENCODINGS: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+
+GZIP_LEVEL = 6
+# Higher brotli qualities take minutes on large viewers for little gain;
+# the large window lets matches reach across repeated test blocks.
+BROTLI_QUALITY = 5
+BROTLI_WINDOW_BITS = 24
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def available_encodings() -> List[str]:
+    """Content encodings this installation writes"""
+    return [encoding for encoding, _ in ENCODINGS if encoding != "br" or brotli is not None]
+
+
+def _write_gzip(path: str, target: str) -> None:
+    with open(path, 'rb') as src, open(target, 'wb') as raw:
+        # mtime=0 keeps the output identical for identical input
+        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as out:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+
+
+def _write_brotli(path: str, target: str) -> None:
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY, lgwin=BROTLI_WINDOW_BITS)
+    with open(path, 'rb') as src, open(target, 'wb') as out:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(compressor.process(chunk))
+        out.write(compressor.finish())
+
+
+def remove_precompressed(path: str) -> None:
+    """Delete compressed variants of *path* left over from an earlier run"""
+    for _, suffix in ENCODINGS:
+        try:
+            os.unlink(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def write_precompressed(path: str, skip_existing: bool = False) -> List[str]:
+    """Write every available compressed variant of *path* beside it.
+
+    Each variant is written under a temporary name and renamed into place,
+    so a reader never sees a partial file. With *skip_existing*, variants
+    that are already present are left alone (for content-addressed files).
+    Returns the variant paths.
+    """
+    writers = {"gzip": _write_gzip, "br": _write_brotli}
+    written = []
+    for encoding, suffix in ENCODINGS:
+        if encoding not in available_encodings():
+            continue
+        target = path + suffix
+        if skip_existing and os.path.exists(target):
+            written.append(target)
+            continue
+        tmp = f"{target}.{os.getpid()}.tmp"
+        try:
+            writers[encoding](path, tmp)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        written.append(target)
+    return written
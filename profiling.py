@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Profiling Module
+Per-stage timings and memory tracing for ``create_viewer``.
+
+A ``StageProfiler`` records wall time, CPU time and the ``tracemalloc`` peak
+of every stage of a conversion (stages may nest, e.g. ``html/sidebar``), and
+can additionally run ``cProfile`` over the whole conversion. Results are
+available as plain data (``to_dict``) for JSON, or as a printable table.
+"""
+
+import contextlib
+import cProfile
+import json
+import time
+import tracemalloc
+from typing import Dict, Iterator, List, Optional
+
+
+class _Frame:
+    __slots__ = ('path', 'wall', 'cpu', 'memory', 'peak')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        self.peak = self.memory
+
+
+class StageProfiler:
+    """Collects per-stage measurements of one conversion.
+
+    Wrap the whole conversion in ``run()``, which starts memory tracing (and
+    cProfile when *pstats_path* is given) and records the ``total`` stage;
+    stages are measured with ``stage(name)``. Memory figures are bytes
+    allocated by Python as seen by ``tracemalloc``: ``peak`` is the highest
+    total reached during the stage, ``delta`` what the stage left allocated.
+    """
+
+    def __init__(self, trace_memory: bool = True, pstats_path: Optional[str] = None):
+        self.trace_memory = trace_memory
+        self.pstats_path = pstats_path
+        self.stages: List[Dict] = []
+        self._open: List[_Frame] = []
+
+    def _fold_peak(self) -> None:
+        """Credit the peak since the last reset to every open stage"""
+        if not tracemalloc.is_tracing():
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._open:
+            frame.peak = max(frame.peak, peak)
+        tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the enclosed block as stage *name* (nested under open stages)"""
+        self._fold_peak()
+        # Stages are named relative to the run (``total``), which encloses all
+        parent = self._open[-1].path if self._open and self._open[-1].path != "total" else ""
+        path = f"{parent}/{name}" if parent else name
+        frame = _Frame(path)
+        self._open.append(frame)
+        # Reserve the slot now so stages are listed in the order they started
+        index = len(self.stages)
+        self.stages.append({})
+        try:
+            yield
+        finally:
+            self._fold_peak()
+            self._open.pop()
+            current = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+            self.stages[index] = {
+                "stage": path,
+                "wall_seconds": time.perf_counter() - frame.wall,
+                "cpu_seconds": time.process_time() - frame.cpu,
+                "memory_peak_bytes": frame.peak if tracemalloc.is_tracing() else None,
+                "memory_delta_bytes": current - frame.memory if tracemalloc.is_tracing() else None,
+            }
+
+    @contextlib.contextmanager
+    def run(self) -> Iterator[None]:
+        """Profile the enclosed conversion as the ``total`` stage"""
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        profile = cProfile.Profile() if self.pstats_path else None
+        try:
+            if profile is not None:
+                profile.enable()
+            with self.stage("total"):
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(self.pstats_path)
+            if started_tracing:
+                tracemalloc.stop()
+
+    def to_dict(self) -> Dict:
+        """The measurements as JSON-serialisable data, stages in start order"""
+        return {"stages": list(self.stages), "pstats": self.pstats_path}
+
+    def save(self, path: str, **info) -> None:
+        """Write ``to_dict()`` as JSON to *path*, with *info* added at the top level"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(info, **self.to_dict()), f, indent=1)
+
+    def format_table(self) -> str:
+        """The measurements as a table for the console"""
+        def mib(value: Optional[int]) -> str:
+            return "-" if value is None else f"{value / 1024 ** 2:.1f}"
+
+        rows = [(s["stage"], f"{s['wall_seconds']:.3f}", f"{s['cpu_seconds']:.3f}",
+                 mib(s["memory_peak_bytes"])) for s in self.to_dict()["stages"]]
+        headers = ("Stage", "Wall (s)", "CPU (s)", "Peak (MiB)")
+        widths = [max(len(row[c]) for row in rows + [headers]) for c in range(4)]
+        lines = ["  ".join(h.ljust(w) if c == 0 else h.rjust(w)
+                           for c, (h, w) in enumerate(zip(headers, widths)))]
+        lines.append("  ".join("-" * w for w in widths))
+        for row in rows:
+            lines.append("  ".join(v.ljust(w) if c == 0 else v.rjust(w)
+                                   for c, (v, w) in enumerate(zip(row, widths))))
+        if self.pstats_path:
+            lines.append(f"cProfile statistics written to {self.pstats_path}")
+        return "\n".join(lines)
+
+
+def profile_stage(profiler: Optional[StageProfiler], name: str):
+    """``profiler.stage(name)``, or a no-op context without a profiler"""
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(name)
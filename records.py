@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Records Module
+Compact in-memory model for the tests and commands extracted from a results XML.
+
+Runs can contain hundreds of thousands of commands, so records use
+``__slots__`` instead of per-instance dicts, statuses are shared enum members
+and derived counts are computed on demand. Both record types are read-only
+``Mapping`` views with the same keys as the plain dicts used before, so code
+such as ``test['passed_commands']`` or ``cmd['status']`` keeps working.
+"""
+
+import sys
+from collections.abc import Mapping
+from enum import Enum
+from typing import Iterator, List, Optional, Union
+
+
+class Status(str, Enum):
+    """Status of a command or test; compares equal to its string value"""
+
+    PASS = 'PASS'
+    FAIL = 'FAIL'
+    PARTIAL = 'PARTIAL'
+    UNKNOWN = 'UNKNOWN'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+_STATUS_BY_VALUE = {member.value: member for member in Status}
+
+
+def intern_status(value: str) -> Union[Status, str]:
+    """Map a summary ``data-value`` to a shared ``Status`` or interned string"""
+    return _STATUS_BY_VALUE.get(value) or sys.intern(value)
+
+
+class CommandRecord(Mapping):
+    """A single ``<command>`` within a test.
+
+    *ordinal* is the position of the element among all ``<command>`` elements
+    of the document, which lets the viewer find it without searching.
+    """
+
+    __slots__ = ('number', 'text', 'return_value', 'ordinal')
+
+    _KEYS = ('number', 'text', 'return_value', 'status')
+
+    def __init__(self, number: int, text: str, return_value: str, ordinal: int = -1):
+        self.number = number
+        self.text = text
+        # Return values repeat a lot ('0' in the common case)
+        self.return_value = sys.intern(return_value)
+        self.ordinal = ordinal
+
+    @property
+    def status(self) -> Status:
+        return Status.PASS if self.return_value == '0' else Status.FAIL
+
+    @property
+    def passed(self) -> bool:
+        return self.return_value == '0'
+
+    def __getitem__(self, key: str):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"CommandRecord({self.number!r}, {self.text!r}, {self.return_value!r})"
+
+
+class TestRecord(Mapping):
+    """A single ``<test>`` with its commands"""
+
+    __slots__ = ('name', 'description', 'logical_device', 'summary_status',
+                 'commands', '_passed')
+
+    _KEYS = ('name', 'description', 'logical_device', 'status', 'commands',
+             'command_count', 'total_commands', 'passed_commands')
+
+    # Keep pytest from trying to collect this class when it is imported
+    __test__ = False
+
+    def __init__(self, name: str, description: str, logical_device: str,
+                 summary_status: Optional[str], commands: List[CommandRecord]):
+        self.name = name
+        self.description = description
+        self.logical_device = logical_device
+        self.summary_status = intern_status(summary_status) if summary_status is not None else Status.UNKNOWN
+        self.commands = commands
+        self._passed: Optional[int] = None
+
+    @property
+    def command_count(self) -> int:
+        return len(self.commands)
+
+    @property
+    def total_commands(self) -> int:
+        return len(self.commands)
+
+    @property
+    def passed_commands(self) -> int:
+        if self._passed is None:
+            self._passed = sum(1 for cmd in self.commands if cmd.passed)
+        return self._passed
+
+    @property
+    def status(self) -> Union[Status, str]:
+        """Overall status derived from the commands, else the summary value"""
+        if not self.commands:
+            return self.summary_status
+
+        passed = self.passed_commands
+        if passed == len(self.commands):
+            return Status.PASS
+        if passed == 0:
+            return Status.FAIL
+        return Status.PARTIAL
+
+    def __getitem__(self, key: str):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"TestRecord({self.name!r}, status={self.status!s}, commands={len(self.commands)})"
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Result Cache for RHCert XML Viewer
+----------------------------------
+On-disk cache of generated viewers keyed by the SHA-256 of the uploaded XML.
+Re-uploading the same results file serves the stored HTML/CSS/JS instead of
+running ``create_viewer`` again. Entries are evicted least-recently-used
+first once the cache grows past its size budget.
+
+Each conversion writes into its own staging directory, which is renamed into
+place when complete, so concurrent workers (or replicas sharing the cache
+volume) never see or clobber each other's partial output.
+"""
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+META_FILENAME = "entry.json"
+STAGING_DIRNAME = ".staging"
+ASSETS_DIRNAME = "assets"
+# Hit/miss counters, shared by every process using the cache directory
+STATS_FILENAME = "stats.sqlite3"
+
+# Staging directories older than this belong to conversions that died
+STAGING_MAX_AGE = 6 * 60 * 60
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class CacheEntry:
+    """A completed cache entry: one directory holding a generated viewer"""
+
+    def __init__(self, key: str, path: Path, base_name: str):
+        self.key = key
+        self.path = path
+        self.base_name = base_name
+
+    @property
+    def viewer_filename(self) -> str:
+        return f"{self.base_name}-viewer.html"
+
+    @property
+    def files(self) -> List[str]:
+        """Generated files stored in the entry (excluding bookkeeping)"""
+        return sorted(p.name for p in self.path.iterdir() if p.name != META_FILENAME)
+
+
+class ResultCache:
+    """Content-addressed store of generated viewers with LRU eviction.
+
+    Hit/miss counters live in a SQLite database in the cache root, so they
+    cover every worker process (and replica) sharing the directory.
+    """
+
+    def __init__(self, root: str, max_bytes: int, version: str):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.staging_root = self.root / STAGING_DIRNAME
+        self.staging_root.mkdir(parents=True, exist_ok=True)
+        # Content-hashed CSS/JS shared by every entry (see ``static_assets``)
+        self.asset_root = self.root / ASSETS_DIRNAME
+        self.asset_root.mkdir(exist_ok=True)
+        self.stats_path = self.root / STATS_FILENAME
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.executemany("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)",
+                             [("hits",), ("misses",)])
+
+    # -----------------------------------------------------------------------
+    # Entry access
+    # -----------------------------------------------------------------------
+
+    def entry_path(self, key: str) -> Path:
+        """Directory for *key*; rejects anything that is not a SHA-256 hex digest"""
+        if not _KEY_RE.match(key):
+            raise ValueError(f"Invalid cache key: {key!r}")
+        return self.root / key
+
+    def lookup(self, key: str, count: bool = True) -> Optional[CacheEntry]:
+        """Return the entry for *key* and mark it as recently used, or ``None``.
+
+        The lookup counts as a hit or miss unless *count* is false, e.g. when
+        fetching the entry of a finished job again.
+        """
+        entry = self._read_entry(key)
+        if count:
+            with self._connect() as conn:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = ?",
+                             ("misses" if entry is None else "hits",))
+        if entry is not None:
+            try:
+                os.utime(entry.path / META_FILENAME)
+            except OSError:
+                pass
+        return entry
+
+    def stage(self, key: str) -> Path:
+        """Create a private directory to generate the entry for *key* into"""
+        self.entry_path(key)  # validate
+        return Path(tempfile.mkdtemp(prefix=f"{key}.", dir=self.staging_root))
+
+    def commit(self, key: str, staging: Path, base_name: str) -> CacheEntry:
+        """Move the files generated into *staging* into place as the entry for *key*.
+
+        If another worker committed *key* first, its entry is kept and
+        *staging* is dropped.
+        """
+        path = self.entry_path(key)
+        self._write_meta(staging, base_name)
+
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # Lost the race to a concurrent conversion of the same upload, or
+            # an outdated entry is in the way
+            existing = self._read_entry(key)
+            if existing is not None:
+                self.discard_staging(staging)
+                self.evict(keep=key)
+                return existing
+            self.discard(key)
+            os.rename(staging, path)
+
+        self.evict(keep=key)
+        return CacheEntry(key, path, base_name)
+
+    def add_file(self, entry: CacheEntry, source: Path, filename: str) -> Path:
+        """Move *source* into *entry* as *filename*, e.g. a derived download.
+
+        The file counts towards the cache size from then on, so other entries
+        may be evicted to make room.
+        """
+        target = entry.path / filename
+        os.replace(source, target)
+        self._write_meta(entry.path, entry.base_name)
+        self.evict(keep=entry.key)
+        return target
+
+    def discard_staging(self, staging: Path) -> None:
+        """Remove a staging directory from ``stage`` that will not be committed"""
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def discard(self, key: str) -> None:
+        """Remove the entry (complete or not) for *key*"""
+        shutil.rmtree(self.entry_path(key), ignore_errors=True)
+
+    # -----------------------------------------------------------------------
+    # Eviction & statistics
+    # -----------------------------------------------------------------------
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Delete least recently used entries until the cache fits its budget,
+        along with abandoned staging directories"""
+        self._reclaim_staging()
+        entries = self._scan()
+        total = sum(size for _, _, size in entries)
+
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.discard(key)
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        entries = self._scan()
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters"))
+        return {
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "entries": len(entries),
+            "bytes": sum(size for _, _, size in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    # -----------------------------------------------------------------------
+    # Internals
+    # -----------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.stats_path, timeout=30)
+
+    def _write_meta(self, path: Path, base_name: str) -> None:
+        """Record version, base name and size of the files in *path*"""
+        size = sum(p.stat().st_size for p in path.iterdir()
+                   if p.is_file() and p.name != META_FILENAME)
+        meta = {"version": self.version, "base_name": base_name, "size": size}
+
+        # Replaced atomically: readers never see a partial file
+        tmp = path / f"{META_FILENAME}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, path / META_FILENAME)
+
+    def _read_entry(self, key: str) -> Optional[CacheEntry]:
+        path = self.entry_path(key)
+        try:
+            meta = json.loads((path / META_FILENAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if meta.get("version") != self.version:
+            # Produced by an older generator: regenerate instead of serving it
+            self.discard(key)
+            return None
+        return CacheEntry(key, path, meta["base_name"])
+
+    def _scan(self) -> List[tuple]:
+        """``(last_used, key, size)`` for every complete entry"""
+        entries = []
+        for path in self.root.iterdir():
+            if path.name in (STAGING_DIRNAME, ASSETS_DIRNAME):
+                continue
+            meta_path = path / META_FILENAME
+            try:
+                last_used = meta_path.stat().st_mtime
+                size = json.loads(meta_path.read_text(encoding="utf-8"))["size"]
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append((last_used, path.name, size))
+        return entries
+
+    def _reclaim_staging(self) -> None:
+        cutoff = time.time() - STAGING_MAX_AGE
+        for path in self.staging_root.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
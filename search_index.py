@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Search Index Module
+Builds the trigram index the viewer uses to filter tests while the user types.
+"""
+
+from typing import Dict, Iterable, List, Set
+
+GRAM_SIZE = 3
+
+# Grams present in more than this share of the tests narrow nothing down;
+# they are listed as stop grams instead of carrying a posting list.
+STOP_GRAM_RATIO = 0.5
+STOP_GRAM_MIN_TESTS = 32
+
+
+def _grams(texts: Iterable[str]) -> Set[str]:
+    """All lower-cased trigrams of *texts* (grams never span two texts)"""
+    grams: Set[str] = set()
+    for text in texts:
+        text = text.lower()
+        grams.update(text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1))
+    return grams
+
+
+def _delta_encode(values: List[int]) -> List[int]:
+    encoded = []
+    previous = 0
+    for value in values:
+        encoded.append(value - previous)
+        previous = value
+    return encoded
+
+
+def build_search_index(tests: List[Dict]) -> Dict:
+    """Build the viewer's search index over test names, descriptions,
+    logical devices and command texts.
+
+    Returns ``{'g': {gram: postings}, 's': stop_grams, 'd': details}`` where
+    *postings* are delta-encoded test indexes and *details* holds each
+    test's ``[description, logical_device]``, which the navigator data
+    island does not carry. Matches are verified against the full text in
+    the browser, so the index only has to narrow down candidate tests.
+    """
+    postings: Dict[str, List[int]] = {}
+    details = []
+
+    for t, test in enumerate(tests):
+        details.append([test['description'], test['logical_device']])
+        fields = [test['name'], test['description'], test['logical_device']]
+        fields.extend({cmd['text'] for cmd in test['commands']})
+        for gram in _grams(fields):
+            postings.setdefault(gram, []).append(t)
+
+    stop_grams = []
+    if len(tests) >= STOP_GRAM_MIN_TESTS:
+        limit = len(tests) * STOP_GRAM_RATIO
+        stop_grams = sorted(gram for gram, ids in postings.items() if len(ids) > limit)
+        for gram in stop_grams:
+            del postings[gram]
+
+    # Sorted so the index (and the page) is the same on every run
+    return {
+        'g': {gram: _delta_encode(postings[gram]) for gram in sorted(postings)},
+        's': stop_grams,
+        'd': details,
+    }
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Static Assets Module
+Naming and writing of the viewer's shared, content-hashed CSS/JS files.
+
+The stylesheet and script are identical for every viewer produced by the same
+code, so they are written once under a name derived from their content
+(``rhcert-viewer-<hash>.css``) and shared by all viewers in a directory. A
+new name on every change lets servers cache them forever.
+"""
+
+import hashlib
+import os
+
+ASSET_PREFIX = "rhcert-viewer-"
+
+
+def asset_filename(content: str, extension: str) -> str:
+    """Content-hashed filename for an asset with *content*"""
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+    return f"{ASSET_PREFIX}{digest}.{extension}"
+
+
+def write_asset(output_dir: str, filename: str, content: str) -> bool:
+    """Write *content* to *output_dir*/*filename* unless it is already there.
+
+    The file is written under a temporary name and renamed into place, so
+    concurrent writers never expose a partial asset. Returns whether the
+    file was written.
+    """
+    path = os.path.join(output_dir, filename)
+    if os.path.exists(path):
+        return False
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return True
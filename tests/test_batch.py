@@ -0,0 +1,28 @@
+import json
+from pathlib import Path
+
+from batch import BatchItem, convert_item
+from benchmarks.fixtures import write_results_xml
+
+
+def test_profile_paths_keep_dotted_base_name():
+    item = BatchItem(Path('in/host.example.com.xml.gz'), Path('out'))
+    assert item.profile_paths == (Path('out/host.example.com-profile.json'),
+                                  Path('out/host.example.com-profile.pstats'))
+
+
+def test_profiles_of_inputs_sharing_a_stem_prefix(tmp_path):
+    items = []
+    for name in ('a.b.xml', 'a.c.xml'):
+        source = tmp_path / name
+        write_results_xml(str(source), tests=2, commands_per_test=2)
+        items.append(BatchItem(source, tmp_path / 'out'))
+    assert items[0].profile_paths[0] != items[1].profile_paths[0]
+    assert items[0].profile_paths[1] != items[1].profile_paths[1]
+
+    for item in items:
+        assert convert_item(item, 'stdlib', precompress=False, profile=True, pstats=True).success
+    for item in items:
+        json_path, pstats_path = item.profile_paths
+        assert json.loads(json_path.read_text())['input'] == str(item.source)
+        assert pstats_path.stat().st_size > 0
@@ -0,0 +1,76 @@
+import bz2
+import gzip
+import lzma
+import os
+
+import pytest
+
+import xml_parser
+from html_generator import _page_middle, _page_tail, create_html_file
+
+JS_FILENAME = 'viewer.js'
+
+# Not produced by any serializer: CRLF line ends, non-ASCII text, CDATA,
+# a comment and attribute quoting that a re-encode would normalise
+RESULTS = ('<?xml version="1.0" encoding="UTF-8"?>\r\n'
+           "<certification-test rhcert-version='10.0'>\r\n<tests>\r\n"
+           + ''.join(f'  <test name="t{i}"><!-- été {i} -->'
+                     f'<command command="echo &quot;{i}&quot;" return-value="{i % 3}">'
+                     f'<output><![CDATA[<✓> {i}\t]]></output></command></test>\r\n'
+                     for i in range(2000))
+           + '</tests>\r\n</certification-test>\r\n').encode('utf-8')
+
+COMPRESSORS = {
+    'plain': lambda data: data,
+    'gz': gzip.compress,
+    'xz': lzma.compress,
+    'bz2': bz2.compress,
+}
+
+
+@pytest.fixture
+def sendfile_calls(monkeypatch):
+    """Record the calls that reach ``os.sendfile``"""
+    if not hasattr(os, 'sendfile'):
+        pytest.skip('os.sendfile is not available')
+    calls = []
+    real_sendfile = os.sendfile
+
+    def sendfile(*args):
+        calls.append(args)
+        return real_sendfile(*args)
+
+    monkeypatch.setattr(os, 'sendfile', sendfile)
+    return calls
+
+
+def _embedded_xml(tmp_path, suffix):
+    name = 'results.xml' + ('' if suffix == 'plain' else f'.{suffix}')
+    xml_path = tmp_path / name
+    xml_path.write_bytes(COMPRESSORS[suffix](RESULTS))
+    html_path = tmp_path / 'viewer.html'
+    create_html_file(str(xml_path), 'viewer.css', JS_FILENAME, [], {}, str(html_path))
+
+    page = html_path.read_bytes()
+    start = page.index(_page_middle().encode('utf-8')) + len(_page_middle().encode('utf-8'))
+    end = page.rindex(_page_tail(JS_FILENAME).encode('utf-8'))
+    return page[start:end]
+
+
+def test_plain_input_is_copied_with_sendfile(tmp_path, sendfile_calls):
+    assert _embedded_xml(tmp_path, 'plain') == RESULTS
+    assert sendfile_calls
+
+
+@pytest.mark.parametrize('suffix', ['plain', 'gz', 'xz', 'bz2'])
+def test_chunked_copy_is_byte_identical(tmp_path, monkeypatch, suffix):
+    # Force the Python copy loop, over many blocks
+    monkeypatch.setattr(xml_parser, 'COPY_CHUNK_SIZE', 4096)
+    monkeypatch.setattr(xml_parser, '_sendfile', lambda in_fd, out_fd: None)
+    assert _embedded_xml(tmp_path, suffix) == RESULTS
+
+
+@pytest.mark.parametrize('suffix', ['gz', 'xz', 'bz2'])
+def test_compressed_input_is_decompressed(tmp_path, sendfile_calls, suffix):
+    assert _embedded_xml(tmp_path, suffix) == RESULTS
+    assert not sendfile_calls
@@ -0,0 +1,142 @@
+import os
+from xml.parsers import expat
+
+import pytest
+
+import xml_parser
+from benchmarks.fixtures import write_results_xml
+from xml_parser import IncrementalResults, ResultsDocument
+
+
+@pytest.fixture(params=[256, xml_parser.COPY_CHUNK_SIZE], ids=['small-chunks', 'default-chunks'])
+def chunk_size(request, monkeypatch):
+    # Small chunks make checkpoints and '</test>' tags straddle reads
+    monkeypatch.setattr(xml_parser, 'COPY_CHUNK_SIZE', request.param)
+    return request.param
+
+
+@pytest.fixture
+def fixture_xml(tmp_path):
+    path = write_results_xml(str(tmp_path / 'fixture.xml'), tests=12, commands_per_test=4,
+                             output_bytes=40, fail_every=3, runs_per_test=2)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _completed(data):
+    """*data* cut back to a token boundary, with its open elements closed"""
+    for opener, closer in ((b'<', b'>'), (b'&', b';')):
+        cut = data.rfind(opener)
+        if cut >= 0 and closer not in data[cut:]:
+            data = data[:cut]
+    stack = []
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = lambda name, attrs: stack.append(name)
+    parser.EndElementHandler = lambda name: stack.pop()
+    parser.Parse(data, False)
+    return data + b''.join(f'</{name}>'.encode() for name in reversed(stack))
+
+
+def _snapshot(document):
+    return (document.attributes, [dict(test) for test in document.tests],
+            [[cmd.ordinal for cmd in test.commands] for test in document.tests],
+            document.failure_marks)
+
+
+class _Checker:
+    """Writes successive contents to one file and compares ``update()`` with a full load"""
+
+    def __init__(self, tmp_path):
+        self.path = tmp_path / 'live.xml'
+        self.reference = tmp_path / 'reference.xml'
+        self.incremental = IncrementalResults(str(self.path))
+        self.content = b''
+
+    def step(self, content, write='rewrite'):
+        if write == 'append':
+            assert content.startswith(self.content)
+            with open(self.path, 'ab') as f:
+                f.write(content[len(self.content):])
+        elif write == 'replace':
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_bytes(content)
+            os.replace(tmp, self.path)
+        else:
+            with open(self.path, 'r+b' if self.path.exists() else 'wb') as f:
+                f.write(content)
+                f.truncate()
+
+        document = self.incremental.update()
+        self.reference.write_bytes(_completed(content))
+        assert _snapshot(document) == _snapshot(ResultsDocument.load(str(self.reference)))
+
+        # Resuming is only allowed over bytes that did not change
+        resumed = self.incremental.resumed_from
+        assert content[:resumed] == self.content[:resumed]
+        assert resumed <= len(self.content)
+        self.content = content
+        return resumed
+
+
+def _root_end(data):
+    return data.index(b'>', data.index(b'<certification-test')) + 1
+
+
+def test_append_only_growth(tmp_path, chunk_size, fixture_xml):
+    checker = _Checker(tmp_path)
+    cuts = list(range(_root_end(fixture_xml), len(fixture_xml), 211)) + [len(fixture_xml)]
+    resumed = []
+    for cut in cuts:
+        resumed.append(checker.step(fixture_xml[:cut], write='append'))
+    # Once tests have completed, later updates resume instead of starting over
+    assert resumed[0] == 0
+    assert sum(1 for offset in resumed if offset) > len(cuts) // 2
+
+
+def test_partially_written_test_end_tag(tmp_path, chunk_size, fixture_xml):
+    checker = _Checker(tmp_path)
+    first = fixture_xml.index(b'</test>')
+    second = fixture_xml.index(b'</test>', first + 1)
+    checker.step(fixture_xml[:first + len(b'</test>')], write='append')
+    for cut in range(second, second + len(b'</test>') + 1):
+        assert checker.step(fixture_xml[:cut], write='append') > 0
+    checker.step(fixture_xml, write='append')
+
+
+def test_rewritten_prefix_starts_over(tmp_path, chunk_size, fixture_xml):
+    checker = _Checker(tmp_path)
+    middle = fixture_xml.index(b'</test>', len(fixture_xml) // 2)
+    checker.step(fixture_xml[:middle])
+    assert checker.step(fixture_xml[:middle + 50], write='append') > 0
+
+    # Same length, different first test: everything must be parsed again
+    changed = fixture_xml.replace(b'name="core-0"', b'name="kore-0"', 1)
+    assert changed != fixture_xml
+    assert checker.step(changed) == 0
+    assert checker.step(changed.replace(b'return-value="1"', b'return-value="7"')) == 0
+
+
+def test_truncation(tmp_path, chunk_size, fixture_xml):
+    checker = _Checker(tmp_path)
+    checker.step(fixture_xml)
+    # Cut below the last checkpoint: nothing to resume from
+    assert checker.step(fixture_xml[:fixture_xml.index(b'</test>') - 10]) == 0
+    checker.step(fixture_xml[:len(fixture_xml) // 2], write='append')
+    # Cut within the unchecked tail: the prefix is intact
+    tail = fixture_xml.rindex(b'</test>', 0, len(fixture_xml) // 2)
+    assert checker.step(fixture_xml[:tail + len(b'</test>') + 5]) > 0
+
+
+def test_replaced_file(tmp_path, chunk_size, fixture_xml):
+    checker = _Checker(tmp_path)
+    checker.step(fixture_xml[:len(fixture_xml) * 2 // 3])
+
+    other = write_results_xml(str(tmp_path / 'other.xml'), tests=5, commands_per_test=2,
+                              output_bytes=40, seed=1)
+    with open(other, 'rb') as f:
+        other_xml = f.read()
+    assert checker.step(other_xml, write='replace') == 0
+    # Replaced by a longer version of itself: resumes as for an append
+    assert checker.step(fixture_xml, write='replace') == 0
+    longer = fixture_xml.replace(b'</tests>', b'<test name="extra"><summary data-value="PASS"/></test></tests>')
+    assert checker.step(longer, write='replace') > 0
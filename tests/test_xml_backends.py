@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+from xml_backends import available_backends, get_backend
+from xml_parser import iter_test_structure
+
+NO_TESTS = (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+            b'<!-- no tests yet -->\n'
+            b'<certification-test rhcert-version="10.0" rhcert-release="1" plan-time="2025-01-01">'
+            b'<hardware><vendor>ACME</vendor></hardware></certification-test>\n')
+
+WITH_TESTS = (b'<certification-test rhcert-version="10.0" rhcert-release="2">'
+              b'<tests><test name="core"><run><summary data-value="PASS"/>'
+              b'<command command="lscpu" return-value="0"><output>ok</output></command>'
+              b'<command command="false" return-value="1"><output>no</output></command>'
+              b'</run></test></tests></certification-test>')
+
+
+def _parse(backend_name, data):
+    attributes = {}
+    tests = list(iter_test_structure(io.BytesIO(data), attributes, get_backend(backend_name)))
+    return attributes, tests
+
+
+@pytest.mark.skipif('lxml' not in available_backends(), reason='lxml is not installed')
+@pytest.mark.parametrize('data', [NO_TESTS, WITH_TESTS], ids=['no-tests', 'with-tests'])
+def test_backends_agree(data):
+    assert _parse('lxml', data) == _parse('stdlib', data)
+
+
+@pytest.mark.parametrize('backend_name', available_backends())
+def test_root_attributes_without_tests(backend_name):
+    attributes, tests = _parse(backend_name, NO_TESTS)
+    assert tests == []
+    assert attributes == {'rhcert_version': '10.0', 'rhcert_release': '1', 'plan_time': '2025-01-01'}
@@ -0,0 +1,127 @@
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from xml_backends import available_backends, get_backend
+from xml_parser import ResultsDocument, extract_test_structure, iter_test_structure
+
+# Nested tests, commands outside any test, an empty command text, summaries
+# without data-value and FAIL/WARN messages
+NESTED = b'''<?xml version="1.0" encoding="UTF-8"?>
+<certification-test rhcert-version="10.0" rhcert-release="3" plan-time="2025-01-01 00:00:00">
+  <command command="setup" return-value="0"/>
+  <tests>
+    <test name="outer" description="Outer test" logical-device="dev0">
+      <summary/>
+      <command command="a" return-value="0"><output>ok</output></command>
+      <test name="inner">
+        <summary data-value="FAIL"/>
+        <message level="warn">careful</message>
+        <command command="" return-value="0"/>
+        <command command="b" return-value="2"/>
+      </test>
+      <summary data-value="PASS"/>
+      <command command="c" return-value="1"/>
+    </test>
+    <test name="summary-only"><run><summary data-value="REVIEW"/></run></test>
+    <test name="no-value"><summary/><message level="INFO">fine</message></test>
+    <test/>
+  </tests>
+  <command command="teardown" return-value="3"/>
+</certification-test>
+'''
+
+EXPECTED = [
+    {'name': 'outer', 'description': 'Outer test', 'logical_device': 'dev0', 'status': 'PARTIAL',
+     'commands': [{'number': 1, 'text': 'a', 'return_value': '0', 'status': 'PASS'},
+                  {'number': 2, 'text': 'c', 'return_value': '1', 'status': 'FAIL'}],
+     'command_count': 2, 'total_commands': 2, 'passed_commands': 1},
+    # The empty command still takes number 1
+    {'name': 'inner', 'description': '', 'logical_device': '', 'status': 'FAIL',
+     'commands': [{'number': 2, 'text': 'b', 'return_value': '2', 'status': 'FAIL'}],
+     'command_count': 1, 'total_commands': 1, 'passed_commands': 0},
+    {'name': 'summary-only', 'description': '', 'logical_device': '', 'status': 'REVIEW',
+     'commands': [], 'command_count': 0, 'total_commands': 0, 'passed_commands': 0},
+    {'name': 'no-value', 'description': '', 'logical_device': '', 'status': 'UNKNOWN',
+     'commands': [], 'command_count': 0, 'total_commands': 0, 'passed_commands': 0},
+    {'name': 'Unknown Test', 'description': '', 'logical_device': '', 'status': 'UNKNOWN',
+     'commands': [], 'command_count': 0, 'total_commands': 0, 'passed_commands': 0},
+]
+
+EXPECTED_ATTRIBUTES = {'rhcert_version': '10.0', 'rhcert_release': '3', 'plan_time': '2025-01-01 00:00:00'}
+
+# Flat documents (no nesting) must still give exactly what the original
+# per-test findall extraction produced
+FLAT = b'''<certification-test>
+  <test name="core" description="CPU" logical-device="cpu0">
+    <run><summary data-value="PASS"/>
+      <command command="lscpu" return-value="0"/>
+      <command command="" return-value="1"/>
+      <command command="stress" return-value="1"/>
+    </run>
+    <run><summary data-value="FAIL"/><command command="lscpu" return-value="0"/></run>
+  </test>
+  <test name="memory"><summary data-value="WARN"/></test>
+  <test name="empty"/>
+</certification-test>
+'''
+
+
+def _findall_structure(root):
+    """The original extraction: descendant searches from every test"""
+    tests = []
+    for test_elem in root.findall('.//test'):
+        status = 'UNKNOWN'
+        summary_elem = test_elem.find('.//summary')
+        if summary_elem is not None:
+            status = summary_elem.get('data-value', 'UNKNOWN')
+        commands = []
+        for i, command_elem in enumerate(test_elem.findall('.//command'), 1):
+            command_text = command_elem.get('command', '')
+            return_value = command_elem.get('return-value', '0')
+            if command_text:
+                commands.append({'number': i, 'text': command_text, 'return_value': return_value,
+                                 'status': 'PASS' if return_value == '0' else 'FAIL'})
+        passed = sum(1 for cmd in commands if cmd['status'] == 'PASS')
+        if commands:
+            overall = 'PASS' if passed == len(commands) else 'FAIL' if passed == 0 else 'PARTIAL'
+        else:
+            overall = status
+        tests.append({'name': test_elem.get('name', 'Unknown Test'),
+                      'description': test_elem.get('description', ''),
+                      'logical_device': test_elem.get('logical-device', ''),
+                      'status': overall, 'commands': commands, 'command_count': len(commands),
+                      'total_commands': len(commands), 'passed_commands': passed})
+    return tests
+
+
+def test_tree_walk_nested():
+    assert extract_test_structure(ET.fromstring(NESTED)) == EXPECTED
+
+
+@pytest.mark.parametrize('backend_name', available_backends())
+def test_streaming_nested(backend_name):
+    attributes = {}
+    tests = list(iter_test_structure(io.BytesIO(NESTED), attributes, get_backend(backend_name)))
+    assert tests == EXPECTED
+    assert attributes == EXPECTED_ATTRIBUTES
+
+
+@pytest.mark.parametrize('backend_name', available_backends())
+def test_flat_document_matches_findall_extraction(backend_name):
+    expected = _findall_structure(ET.fromstring(FLAT))
+    assert extract_test_structure(ET.fromstring(FLAT)) == expected
+    assert list(iter_test_structure(io.BytesIO(FLAT), backend=get_backend(backend_name))) == expected
+
+
+@pytest.mark.parametrize('backend_name', available_backends())
+def test_ordinals_and_failure_marks(tmp_path, backend_name):
+    xml_path = tmp_path / 'results.xml'
+    xml_path.write_bytes(NESTED)
+    document = ResultsDocument.load(str(xml_path), get_backend(backend_name))
+
+    # Ordinals count every <command> in the document, inside a test or not
+    assert [[cmd.ordinal for cmd in test.commands] for test in document.tests] == [[1, 4], [3], [], [], []]
+    assert document.failure_marks == [('m', 0), ('c', 3), ('c', 4), ('c', 5)]
+    assert document.attributes == EXPECTED_ATTRIBUTES
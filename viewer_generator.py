@@ -4,20 +4,71 @@ Red Hat Certification Viewer Generator
 Main orchestrator script that creates the complete viewer using modular components.
 """
 
+import argparse
+import contextlib
+import hashlib
 import os
 import sys
-import xml.etree.ElementTree as ET
+import time
+from functools import lru_cache
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from xml.parsers import expat
 
 # Import our modular components
-from xml_parser import extract_test_structure, get_xml_attributes
-from css_generator import create_css_file
-from js_generator import create_js_file
+from xml_parser import IncrementalResults, ResultsDocument, is_compressed, results_base_name
+from xml_backends import BACKEND_CHOICES, get_backend
+from css_generator import create_css_file, css_asset_filename
+from js_generator import create_js_file, js_asset_filename
 from html_generator import create_html_file
+from search_index import build_search_index
+from batch import BatchItem, collect_inputs, convert_item, make_profiler, print_summary, run_batch
+from build_manifest import BuildManifest
+from file_watch import open_watcher
+from precompress import available_encodings, remove_precompressed, write_precompressed
+from profiling import StageProfiler, profile_stage
 
+# Modules whose source determines the generated output
+_PIPELINE_MODULES = (
+    "viewer_generator", "xml_parser", "xml_backends", "records",
+    "css_generator", "js_generator", "html_generator", "search_index",
+    "precompress", "static_assets",
+)
 
-def create_viewer(xml_file_path: str) -> bool:
-    """Create the complete Red Hat certification viewer"""
+
+@lru_cache(maxsize=None)
+def generator_version() -> str:
+    """Short hash of the generator code, used to invalidate cached output"""
+    digest = hashlib.sha256()
+    source_dir = Path(__file__).resolve().parent
+    for module in _PIPELINE_MODULES:
+        digest.update((source_dir / f"{module}.py").read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def create_viewer(xml_file_path: str, backend: Optional[str] = None,
+                  output_dir: str = '.',
+                  progress: Optional[Callable[[str, float], None]] = None,
+                  precompress: bool = False, asset_dir: Optional[str] = None,
+                  document: Optional[ResultsDocument] = None,
+                  profiler: Optional[StageProfiler] = None) -> bool:
+    """Create the complete Red Hat certification viewer
+
+    *backend* names the XML parser backend (see ``xml_backends``); by default
+    it is picked automatically. The HTML is written to *output_dir*; the
+    shared, content-hashed CSS and JS go to *asset_dir* (default:
+    *output_dir*) unless already there. The viewer refers to them by bare
+    filename, so a server keeping them elsewhere must map those URLs to
+    *asset_dir*. Compressed ``.gz``/``.br`` copies are written beside all of
+    them if *precompress* is set. *progress*, if given, is called as
+    ``progress(stage, fraction)`` with stage ``'parse'`` or ``'render'``.
+    *document* is the already parsed file (as kept up to date by watch
+    mode); parsing is skipped when it is given. *profiler* records each step
+    as a stage (see ``profiling``); wrap the call in ``profiler.run()``.
+    """
+    def report(stage: str, fraction: float) -> None:
+        if progress is not None:
+            progress(stage, fraction)
 
     if not os.path.exists(xml_file_path):
         print(f"Error: XML file '{xml_file_path}' not found!")
@@ -27,27 +78,57 @@ def create_viewer(xml_file_path: str) -> bool:
 
     try:
         # Extract base name for output files
-        base_name = Path(xml_file_path).stem
+        base_name = results_base_name(xml_file_path)
 
         # Parse XML and extract test structure
-        print("Parsing XML and extracting test structure...")
-        tree = ET.parse(xml_file_path)
-        root = tree.getroot()
-        tests = extract_test_structure(root)
-        xml_attrs = get_xml_attributes(xml_file_path)
+        if document is None:
+            parser_backend = get_backend(backend)
+            print(f"Parsing XML and extracting test structure ({parser_backend.name} backend)...")
+            with profile_stage(profiler, 'parse'):
+                document = ResultsDocument.load(
+                    xml_file_path, parser_backend,
+                    (lambda fraction: report('parse', fraction)) if progress else None)
+        else:
+            report('parse', 1.0)
 
-        print(f"Found {len(tests)} tests with {sum(len(t['commands']) for t in tests)} total commands")
+        print(f"Found {len(document.tests)} tests with {document.command_count} total commands")
 
         # Generate separate files
         print("Generating CSS file...")
-        css_filename = create_css_file(base_name)
+        if asset_dir is None:
+            asset_dir = output_dir
+        with profile_stage(profiler, 'css'):
+            css_filename = create_css_file(asset_dir)
+        report('render', 0.05)
 
         print("Generating JavaScript file...")
-        js_filename = create_js_file(base_name)
+        with profile_stage(profiler, 'js'):
+            js_filename = create_js_file(asset_dir)
+        report('render', 0.1)
+
+        print("Building search index...")
+        with profile_stage(profiler, 'search_index'):
+            search_index = build_search_index(document.tests)
+        report('render', 0.3)
 
         print("Generating HTML file...")
         html_filename = f"{base_name}-viewer.html"
-        create_html_file(xml_file_path, css_filename, js_filename, tests, xml_attrs, html_filename)
+        with profile_stage(profiler, 'html'):
+            create_html_file(document.path, css_filename, js_filename, document.tests,
+                             document.attributes, os.path.join(output_dir, html_filename),
+                             search_index, document.failure_marks, profiler)
+
+        if precompress:
+            report('render', 0.7)
+            print(f"Precompressing output ({', '.join(available_encodings())})...")
+            with profile_stage(profiler, 'precompress'):
+                write_precompressed(os.path.join(output_dir, html_filename))
+                for filename in (css_filename, js_filename):
+                    write_precompressed(os.path.join(asset_dir, filename), skip_existing=True)
+        else:
+            # Never leave variants of an older viewer next to the new one
+            remove_precompressed(os.path.join(output_dir, html_filename))
+        report('render', 1.0)
 
         # Print success message
         print("\nRed Hat Certification Viewer created successfully!")
@@ -71,18 +152,144 @@ def create_viewer(xml_file_path: str) -> bool:
         return False
 
 
+def _input_state(path: Path) -> Optional[Tuple[int, int, int]]:
+    """What identifies a version of an input file, or ``None`` if it is gone"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _regenerate(item: BatchItem, trackers: Dict[Path, IncrementalResults],
+                backend: Optional[str], precompress: bool, profile: bool, pstats: bool) -> None:
+    """Regenerate one viewer in watch mode and print a one-line report"""
+    start = time.perf_counter()
+    document = None
+    resumed = ""
+    try:
+        if not is_compressed(str(item.source)):
+            tracker = trackers.setdefault(item.source, IncrementalResults(str(item.source)))
+            document = tracker.update()
+            if tracker.resumed_from:
+                resumed = f", resumed at byte {tracker.resumed_from:,}"
+    except (OSError, expat.ExpatError) as e:
+        print(f"{time.strftime('%H:%M:%S')} {item.source}: Error parsing XML: {e}")
+        return
+
+    result = convert_item(item, backend, precompress, document, profile, pstats)
+    if result.success:
+        tests = f"{len(document.tests)} tests, " if document is not None else ""
+        print(f"{time.strftime('%H:%M:%S')} {item.source}: {tests}"
+              f"{item.viewer_path} updated in {time.perf_counter() - start:.2f}s{resumed}")
+    else:
+        print(f"{time.strftime('%H:%M:%S')} {item.source}: {result.error}")
+
+
+def watch_inputs(patterns: List[str], output_dir: str, backend: Optional[str] = None,
+                 precompress: bool = False, profile: bool = False, pstats: bool = False) -> None:
+    """Generate viewers for *patterns*, then regenerate them whenever their
+    results files change.
+
+    Uncompressed files are parsed incrementally (see ``IncrementalResults``):
+    a results file that is still being written is accepted as it stands, and
+    each round only parses the part added since the last one. Runs until
+    interrupted.
+    """
+    states: Dict[Path, Optional[Tuple[int, int, int]]] = {}
+    trackers: Dict[Path, IncrementalResults] = {}
+    watcher = open_watcher(patterns)
+    print(f"Watching for changes ({watcher.name}); press Ctrl+C to stop")
+    try:
+        while True:
+            current = {}
+            for item in collect_inputs(patterns, output_dir):
+                state = _input_state(item.source)
+                current[item.source] = state
+                if state is not None and states.get(item.source) != state:
+                    _regenerate(item, trackers, backend, precompress, profile, pstats)
+            states = current
+            for source in set(trackers) - set(current):
+                del trackers[source]
+            watcher.wait()
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        watcher.close()
+
+
+def _convert_batch(items: List[BatchItem], args: argparse.Namespace) -> bool:
+    """Convert *items* in parallel, skipping those that are up to date"""
+    # Only convert what changed since the last run into this directory
+    manifest = BuildManifest.load(args.output_dir, generator_version(), args.precompress)
+    removed = manifest.prune()
+    if removed:
+        print(f"Removed viewers of {removed} deleted results files")
+    todo = manifest.outdated(items, (css_asset_filename(), js_asset_filename()), args.force)
+
+    print(f"Converting {len(todo)} of {len(items)} results files...")
+    start = time.perf_counter()
+    results = run_batch(todo, args.jobs, args.backend, args.precompress, args.profile, args.pstats)
+    for result in results:
+        manifest.record(result)
+    manifest.save()
+    print_summary(results, time.perf_counter() - start, skipped=len(items) - len(todo))
+    return all(result.success for result in results)
+
+
 def main():
     """Main entry point"""
-    if len(sys.argv) != 2:
-        print("Usage: python viewer_generator.py <xml_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Generate the Red Hat certification viewer from results XML files")
+    parser.add_argument("inputs", nargs="+", metavar="xml_file",
+                        help="rhcert results XML file (optionally .gz, .xz or .bz2 compressed), "
+                             "directory of results files or glob pattern")
+    parser.add_argument("--backend", choices=BACKEND_CHOICES, default=None,
+                        help="XML parser backend (default: $RHCERT_XML_BACKEND or auto)")
+    parser.add_argument("--precompress", action="store_true",
+                        help="also write .gz (and .br with brotli installed) copies for web serving")
+    parser.add_argument("-o", "--output-dir", default=".",
+                        help="directory to write viewers to (default: current directory)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="files converted in parallel in batch mode (default: number of CPUs)")
+    parser.add_argument("--profile", action="store_true",
+                        help="record wall/CPU time and traced memory per stage to <name>-profile.json")
+    parser.add_argument("--pstats", action="store_true",
+                        help="like --profile, and also dump cProfile statistics to <name>-profile.pstats")
+    parser.add_argument("--force", action="store_true",
+                        help="in batch mode, convert every file even if its viewer is up to date")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and regenerate viewers whenever their results files change")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch_inputs(args.inputs, args.output_dir, args.backend, args.precompress,
+                     args.profile, args.pstats)
+        return
+
+    items = collect_inputs(args.inputs, args.output_dir)
+    if not items:
+        parser.error("no results files found")
 
-    xml_file = sys.argv[1]
-    success = create_viewer(xml_file)
+    if len(items) == 1 and not Path(args.inputs[0]).is_dir():
+        # A single file keeps the detailed console output of one conversion
+        item = items[0]
+        item.output_dir.mkdir(parents=True, exist_ok=True)
+        profiler = make_profiler(item, args.profile, args.pstats)
+        with profiler.run() if profiler else contextlib.nullcontext():
+            success = create_viewer(str(item.source), backend=args.backend,
+                                    output_dir=str(item.output_dir), precompress=args.precompress,
+                                    profiler=profiler)
+        if profiler is not None:
+            profiler.save(str(item.profile_paths[0]), input=str(item.source))
+            print(f"\n{profiler.format_table()}")
+            print(f"Stage profile written to {item.profile_paths[0]}")
+    else:
+        success = _convert_batch(items, args)
 
     if not success:
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -4,46 +4,86 @@ Simple Web Server for RHCert XML Viewer
 --------------------------------------
 Provides a drag-and-drop interface for uploading Red Hat certification XML
 files. Uploaded files are processed with the existing ``viewer_generator``
-module to produce the interactive HTML viewer, CSS, and JS.
+module to produce the interactive HTML viewer, CSS, and JS. Conversion runs
+in the background (see ``job_queue``): an upload returns a job whose progress
+can be polled at ``/jobs/<id>`` or followed as server-sent events.
 
 Run:
     python web_server.py
 Then visit http://localhost:5000 in your browser.
 """
 
+import hashlib
+import json
+import mimetypes
 import os
+import re
+import shutil
+import tempfile
+import threading
+import time
 from pathlib import Path
+from typing import Dict, Iterator
 
 # Jinja templates need flash messages & list of generated viewers.
 from flask import (
     Flask,
+    Response,
+    abort,
     flash,
+    jsonify,
     redirect,
     render_template,
     request,
     send_from_directory,
     send_file,
+    stream_with_context,
     url_for,
 )
-import io
 import zipfile
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 
-from viewer_generator import create_viewer
+from css_generator import css_asset_filename
+from job_queue import DONE, FINISHED_STATES, JobQueue, JobStore
+from js_generator import js_asset_filename
+from precompress import ENCODINGS as PRECOMPRESSED_ENCODINGS
+from result_cache import CacheEntry, ResultCache
+from static_assets import ASSET_PREFIX
+from viewer_generator import generator_version
+from xml_parser import results_base_name
 
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 
 UPLOAD_FOLDER = "uploads"  # XML files are stored here before processing
-ALLOWED_EXTENSIONS = {"xml"}
-
-# Glob patterns for generated viewer assets; used for cleanup
-GENERATED_PATTERNS = ["*-viewer.html", "*-styles.css", "*-script.js"]
-
-# ``static_url_path=''`` allows us to serve generated viewer files directly
-# from the project root (``static_folder='.'``).
-app = Flask(__name__, static_url_path="", static_folder=".")  # serve assets from project root
+CACHE_FOLDER = "cache"  # generated viewers, one directory per upload SHA-256
+CACHE_MAX_BYTES = int(os.environ.get("RHCERT_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+ALLOWED_EXTENSIONS = {"xml", "xml.gz", "xml.xz", "xml.bz2"}
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+ASSET_MAX_AGE = 365 * 24 * 60 * 60  # content-hashed assets never change
+VIEWER_MAX_AGE = 60 * 60  # then revalidated with If-None-Match
+ZIP_LEVEL = int(os.environ.get("RHCERT_ZIP_LEVEL", 6))  # deflate level of downloads, 0-9
+
+JOB_DATABASE = os.environ.get("RHCERT_JOB_DB", "jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("RHCERT_JOB_WORKERS", 2))  # conversion processes per server worker
+JOB_EVENT_INTERVAL = 0.5  # seconds between progress checks of an event stream
+JOB_EVENT_KEEPALIVE = 15  # seconds between keep-alive comments on an idle stream
+# Each event stream holds a server thread; past this many per worker process
+# the job page falls back to polling, leaving threads for uploads and viewers
+JOB_EVENT_MAX_STREAMS = int(os.environ.get("RHCERT_EVENT_STREAMS", 2))
+# Record per-stage timings and memory of every conversion in its job
+JOB_PROFILE = os.environ.get("RHCERT_PROFILE", "").lower() in ("1", "true", "yes", "on")
+JOB_PSTATS_DIR = os.environ.get("RHCERT_PROFILE_DIR") or None  # cProfile dumps, when profiling
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Upload directories older than this were left behind by a crashed conversion
+UPLOAD_MAX_AGE = 6 * 60 * 60
+
+app = Flask(__name__)
 app.config.update(
     SECRET_KEY="rhcert-upload",  # required for ``flash``
     UPLOAD_FOLDER=UPLOAD_FOLDER,
@@ -51,29 +91,122 @@ app.config.update(
 
 Path(UPLOAD_FOLDER).mkdir(exist_ok=True)
 
+result_cache = ResultCache(CACHE_FOLDER, CACHE_MAX_BYTES, generator_version())
+job_store = JobStore(JOB_DATABASE)
+if JOB_PSTATS_DIR:
+    Path(JOB_PSTATS_DIR).mkdir(parents=True, exist_ok=True)
+job_queue = JobQueue(job_store, JOB_WORKERS, JOB_PROFILE, JOB_PSTATS_DIR)
+_event_streams = threading.BoundedSemaphore(JOB_EVENT_MAX_STREAMS)
+
 # ---------------------------------------------------------------------------
 # Helper utilities
 # ---------------------------------------------------------------------------
 
 def _allowed_file(filename: str) -> bool:
-    """Check if *filename* has an allowed extension."""
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    """Check if *filename* has an allowed (possibly compressed) extension."""
+    name = filename.lower()
+    return any(name.endswith(f".{ext}") for ext in ALLOWED_EXTENSIONS)
+
+
+def _save_upload(file, destination: Path) -> str:
+    """Stream the uploaded *file* to *destination* and return its SHA-256."""
+    digest = hashlib.sha256()
+    with open(destination, "wb") as out:
+        while True:
+            chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def _wants_json() -> bool:
+    """True if the client prefers a JSON response over an HTML page."""
+    best = request.accept_mimetypes.best_match(["text/html", "application/json"])
+    return best == "application/json"
+
+
+def _get_job(job_id: str) -> Dict:
+    """Return the job for *job_id* or abort with 404."""
+    job = job_store.get(job_id) if _JOB_ID_RE.match(job_id) else None
+    if job is None:
+        abort(404)
+    return job
+
+
+def _job_payload(job: Dict) -> Dict:
+    """Public JSON view of a job, with the URLs a client needs next."""
+    payload = {
+        "id": job["id"],
+        "filename": job["filename"],
+        "state": job["state"],
+        "stage": job["stage"],
+        "parse": round(job["parse"] * 100),
+        "render": round(job["render"] * 100),
+        "error": job["error"],
+        "status_url": url_for("job_status", job_id=job["id"]),
+        "events_url": url_for("job_events", job_id=job["id"]),
+    }
+    if job["profile"]:
+        payload["profile"] = json.loads(job["profile"])
+    if job["state"] == DONE:
+        base_name = results_base_name(job["filename"])
+        payload["viewer_url"] = url_for("viewers", key=job["key"], filename=f"{base_name}-viewer.html")
+        payload["download_url"] = url_for("job_download", job_id=job["id"])
+    return payload
+
+
+def _etag(*parts: str) -> str:
+    """Strong entity tag for the representation identified by *parts*."""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _send_generated(directory: Path, filename: str, content_id: str) -> Response:
+    """Send a generated file, preferring a precompressed variant the client accepts.
+
+    *content_id* identifies the contents of *directory* (e.g. cache key and
+    generator version) and, with the file name and encoding, forms the ETag.
+    ``send_file`` then answers ``If-None-Match`` with 304 and serves
+    ``Range`` requests, for each variant separately.
+    """
+    directory = directory.resolve()
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if request.accept_encodings.quality(encoding) <= 0:
+            continue
+        variant = safe_join(str(directory), filename + suffix)
+        if variant is None or not os.path.isfile(variant):
+            continue
+        response = send_file(
+            variant,
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            etag=_etag(content_id, filename, encoding),
+        )
+        response.headers["Content-Encoding"] = encoding
+        break
+    else:
+        response = send_from_directory(directory, filename, as_attachment=False,
+                                       etag=_etag(content_id, filename, "identity"))
+    response.vary.add("Accept-Encoding")
+    return response
 
 
 # ---------------------------------------------------------------------------
-# Utility to purge previously generated viewer assets
+# Utility to reclaim abandoned uploads
 # ---------------------------------------------------------------------------
 
 
-def _cleanup_generated_files() -> None:
-    """Delete previously generated viewer, CSS and JS artifacts."""
-    root = Path(".")
-    for pattern in GENERATED_PATTERNS:
-        for p in root.glob(pattern):
-            try:
-                p.unlink()
-            except OSError:
-                pass
+def _reclaim_stale_uploads() -> None:
+    """Delete upload directories whose conversion never finished."""
+    cutoff = time.time() - UPLOAD_MAX_AGE
+    # A long queue or a slow conversion may still be reading an old upload
+    active = {Path(path).resolve().parent for path in job_store.active_inputs()}
+    for path in Path(UPLOAD_FOLDER).iterdir():
+        try:
+            if path.stat().st_mtime < cutoff and path.resolve() not in active:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
 
 
 # ---------------------------------------------------------------------------
@@ -81,20 +214,77 @@ def _cleanup_generated_files() -> None:
 # ---------------------------------------------------------------------------
 
 
-def _create_zip_package(base_name: str) -> io.BytesIO:
-    """Create an in-memory zip containing viewer, css and js for download."""
+class _ZipStream:
+    """Write-only sink for ``zipfile`` that hands the bytes to a generator.
+
+    Everything written is also copied to *tee*, so the archive streamed to
+    the client is saved on disk at the same time.
+    """
+
+    def __init__(self, tee):
+        self._chunks = []
+        self._tee = tee
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._tee.write(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_filename(entry: CacheEntry) -> str:
+    """Name of the cached zip in *entry* for the configured compression level."""
+    return f"{entry.base_name}-viewer.z{ZIP_LEVEL}.zip"
+
+
+def _iter_zip_package(entry: CacheEntry) -> Iterator[bytes]:
+    """Yield a zip of the viewer, css and js as it is compressed.
+
+    The archive is cached in the entry once fully sent, for later downloads.
+    """
     files = [
-        f"{base_name}-viewer.html",
-        f"{base_name}-styles.css",
-        f"{base_name}-script.js",
+        entry.path / entry.viewer_filename,
+        result_cache.asset_root / css_asset_filename(),
+        result_cache.asset_root / js_asset_filename(),
     ]
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        for fname in files:
-            if Path(fname).exists():
-                zf.write(fname, arcname=fname)
-    buf.seek(0)
-    return buf
+    fd, tmp_name = tempfile.mkstemp(dir=entry.path, suffix=".part")
+    complete = False
+    try:
+        with os.fdopen(fd, "wb") as tee:
+            stream = _ZipStream(tee)
+            with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED, compresslevel=ZIP_LEVEL) as zf:
+                for path in files:
+                    if not path.exists():
+                        continue
+                    # The size decides up front whether ZIP64 headers are needed
+                    zip64 = path.stat().st_size * 1.05 > zipfile.ZIP64_LIMIT
+                    with open(path, "rb") as src, zf.open(path.name, "w", force_zip64=zip64) as dest:
+                        while True:
+                            chunk = src.read(UPLOAD_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            dest.write(chunk)
+                            data = stream.take()
+                            if data:
+                                yield data
+            # Closing the archive wrote the central directory
+            yield stream.take()
+        result_cache.add_file(entry, Path(tmp_name), _zip_filename(entry))
+        complete = True
+    finally:
+        # Also reached when the client disconnects mid-download
+        if not complete:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
 
 
 # ---------------------------------------------------------------------------
@@ -124,53 +314,186 @@ def upload():
         return redirect(url_for("index"))
 
     if not _allowed_file(file.filename):
-        flash("Unsupported file type. Please upload an XML file.")
+        flash("Unsupported file type. Please upload an XML file (optionally .gz, .xz or .bz2 compressed).")
         return redirect(url_for("index"))
 
-    # Before processing, purge earlier generated assets so we only keep the new ones
-    _cleanup_generated_files()
+    _reclaim_stale_uploads()
 
-    # Sanitize filename and store to *uploads/*
+    # Sanitize filename and store to a directory of its own under *uploads/*,
+    # which the conversion job removes when it is done
     filename = secure_filename(file.filename)
-    xml_path = Path(app.config["UPLOAD_FOLDER"]) / filename
-    file.save(xml_path)
-
-    # Trigger viewer generation (HTML, CSS, JS)
-    success = create_viewer(str(xml_path))
-    if not success:
-        flash("Failed to generate viewer from the uploaded XML file.")
-        return redirect(url_for("index"))
-
-    # The viewer filenames follow the pattern: <base>-viewer.html
-    base_name = xml_path.stem
-    viewer_filename = f"{base_name}-viewer.html"
+    upload_dir = Path(tempfile.mkdtemp(dir=app.config["UPLOAD_FOLDER"]))
+    xml_path = upload_dir / filename
+    digest = _save_upload(file, xml_path)
 
     action = request.form.get("action", "view")
 
-    if action == "download":
-        # Send file as attachment
-        zip_bytes = _create_zip_package(base_name)
-        return send_file(
-            zip_bytes,
-            download_name=f"{base_name}-viewer.zip",
+    # Identical bytes were converted before: serve the stored viewer as-is
+    entry = result_cache.lookup(digest)
+    if entry is not None:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        job, _ = job_store.create(digest, filename, state=DONE)
+        if _wants_json():
+            return jsonify(_job_payload(job))
+
+        if action == "download":
+            return redirect(url_for("job_download", job_id=job["id"]))
+        return redirect(url_for("viewers", key=entry.key, filename=entry.viewer_filename))
+
+    # Generate the viewer (HTML, CSS, JS) in the background, into a private
+    # staging directory that is renamed into the cache once complete
+    staging_dir = result_cache.stage(digest)
+    base_name = results_base_name(filename)
+
+    def on_finished(success: bool) -> None:
+        try:
+            if success:
+                result_cache.commit(digest, staging_dir, base_name)
+            else:
+                result_cache.discard_staging(staging_dir)
+        finally:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+    job, created = job_queue.submit(digest, filename, str(xml_path), str(staging_dir), on_finished,
+                                    asset_dir=str(result_cache.asset_root))
+    if not created:
+        # The same bytes are already being converted; follow that job instead
+        result_cache.discard_staging(staging_dir)
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+    if _wants_json():
+        response = jsonify(_job_payload(job))
+        response.status_code = 202
+        response.headers["Location"] = url_for("job_status", job_id=job["id"])
+        return response
+    return redirect(url_for("job_page", job_id=job["id"], action=action))
+
+
+@app.route("/jobs/<job_id>")
+def job_page(job_id: str):
+    """Progress page for a conversion job (JSON for API clients)."""
+    job = _get_job(job_id)
+    if _wants_json():
+        return jsonify(_job_payload(job))
+    action = request.args.get("action", "view")
+    return render_template("job.html", job=_job_payload(job), action=action)
+
+
+@app.route("/jobs/<job_id>/status")
+def job_status(job_id: str):
+    """Current state and progress of a conversion job."""
+    return jsonify(_job_payload(_get_job(job_id)))
+
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id: str):
+    """Stream job progress as server-sent events until the job finishes."""
+    _get_job(job_id)
+    if not _event_streams.acquire(blocking=False):
+        response = Response("Too many progress streams, poll /jobs/<id>/status instead.\n",
+                            status=503, mimetype="text/plain")
+        response.headers["Retry-After"] = "5"
+        return response
+
+    def generate():
+        last = None
+        last_sent = time.monotonic()
+        while True:
+            job = job_store.get(job_id)
+            if job is None:
+                return
+            data = json.dumps(_job_payload(job))
+            if data != last:
+                yield f"data: {data}\n\n"
+                last = data
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= JOB_EVENT_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            if job["state"] in FINISHED_STATES:
+                return
+            time.sleep(JOB_EVENT_INTERVAL)
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    # Runs when the stream ends or the client goes away
+    response.call_on_close(_event_streams.release)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # don't let a proxy hold events back
+    return response
+
+
+@app.route("/jobs/<job_id>/download")
+def job_download(job_id: str):
+    """Download the viewer produced by a finished job as a zip."""
+    job = _get_job(job_id)
+    if job["state"] != DONE:
+        abort(409)
+    entry = result_cache.lookup(job["key"], count=False)
+    if entry is None:
+        abort(410)  # evicted from the cache since the job finished
+
+    download_name = f"{entry.base_name}-viewer.zip"
+    cached_zip = entry.path / _zip_filename(entry)
+    if cached_zip.exists():
+        # Resumable: send_file honours Range / If-Range against the ETag
+        response = send_file(
+            cached_zip.resolve(),
+            download_name=download_name,
             mimetype="application/zip",
             as_attachment=True,
+            etag=_etag(entry.key, result_cache.version, cached_zip.name),
         )
-
-    # Default: view online (inline)
-    return redirect(url_for("downloads", filename=viewer_filename))
-
-
-# ---------------------------------------------------------------------------
-# Convenience route: explicitly serve generated files if required
-# ---------------------------------------------------------------------------
-
-
-@app.route("/downloads/<path:filename>")
-def downloads(filename: str):
-    """Serve files from the project root (HTML, CSS, JS)."""
-    root_dir = Path(__file__).resolve().parent
-    return send_from_directory(root_dir, filename, as_attachment=False)
+        response.cache_control.no_cache = None
+        response.cache_control.private = True
+        response.cache_control.max_age = VIEWER_MAX_AGE
+        return response
+
+    response = Response(_iter_zip_package(entry), mimetype="application/zip")
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    return response
+
+
+@app.route("/viewers/<key>/<path:filename>")
+def viewers(key: str, filename: str):
+    """Serve a generated viewer (HTML, CSS, JS) from the result cache."""
+    try:
+        entry_dir = result_cache.entry_path(key)
+    except ValueError:
+        abort(404)
+
+    if filename.startswith(ASSET_PREFIX) and not (entry_dir / filename).is_file():
+        # Viewers name their CSS/JS relative to themselves; send every viewer
+        # to the one shared copy so browsers download it only once
+        response = redirect(url_for("assets", filename=filename), code=301)
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+    # An entry's files only change when a new generator version rebuilds it
+    response = _send_generated(entry_dir, filename, f"{key}:{result_cache.version}")
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    response.cache_control.max_age = VIEWER_MAX_AGE
+    return response
+
+
+@app.route("/assets/<path:filename>")
+def assets(filename: str):
+    """Serve the content-hashed CSS/JS shared by all viewers."""
+    # The file name already carries the content hash
+    response = _send_generated(result_cache.asset_root, filename, "asset")
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+@app.route("/cache/stats")
+def cache_stats():
+    """Report result cache hit/miss counters and disk usage."""
+    return jsonify(result_cache.stats())
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+XML Backends Module
+Pluggable parser backends used by ``xml_parser`` for streaming parses.
+
+The stdlib ElementTree backend is always available. When lxml is installed
+it is used by default since it parses large results files noticeably faster
+and, with ``huge_tree``, accepts text nodes beyond libxml2's safety limits.
+The choice can be forced with ``RHCERT_XML_BACKEND`` (auto, stdlib, lxml) or
+the ``--backend`` option of ``viewer_generator``.
+"""
+
+import os
+import xml.etree.ElementTree as ET
+from typing import Any, BinaryIO, Dict, FrozenSet, Iterator, List, Optional, Tuple, Union
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml is optional
+    lxml_etree = None
+
+BACKEND_ENV_VAR = "RHCERT_XML_BACKEND"
+BACKEND_CHOICES = ("auto", "stdlib", "lxml")
+
+
+class ParserBackend:
+    """Minimal interface the streaming parser needs from an XML library"""
+
+    name = ""
+
+    def iterparse(self, source: Union[str, BinaryIO],
+                  tags: FrozenSet[str]) -> Iterator[Tuple[str, Any]]:
+        """Yield ``('start' | 'end', element)`` events for *source*.
+
+        Only elements whose tag is in *tags* are reported, plus a start event
+        for the document root first. Once the consumer has handled an end
+        event the element's subtree is discarded, so the tree never grows.
+        """
+        raise NotImplementedError
+
+
+class ElementTreeBackend(ParserBackend):
+    """Backend on the standard library's C-accelerated ElementTree"""
+
+    name = "stdlib"
+
+    def iterparse(self, source: Union[str, BinaryIO],
+                  tags: FrozenSet[str]) -> Iterator[Tuple[str, Any]]:
+        parents: List[ET.Element] = []
+
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                if not parents or elem.tag in tags:
+                    yield event, elem
+                parents.append(elem)
+                continue
+
+            parents.pop()
+            if elem.tag in tags:
+                yield event, elem
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+
+
+class LxmlBackend(ParserBackend):
+    """Backend on lxml (libxml2), only available when lxml is installed"""
+
+    name = "lxml"
+
+    def iterparse(self, source: Union[str, BinaryIO],
+                  tags: FrozenSet[str]) -> Iterator[Tuple[str, Any]]:
+        # Tag filtering happens inside libxml2, so elements nobody asked for
+        # never reach Python. Comments and PIs are dropped for the same reason.
+        # The root is added to the filter so its start event arrives first even
+        # when the document holds none of *tags*.
+        root_tag = _peek_root_tag(source)
+        filter_tags = tags | {root_tag} if root_tag else tags
+        events = lxml_etree.iterparse(
+            source, events=("start", "end"), tag=sorted(filter_tags), huge_tree=True,
+            remove_comments=True, remove_pis=True,
+        )
+
+        root = None
+        for event, elem in events:
+            if root is None:
+                root = elem.getroottree().getroot()
+                if root is not elem:
+                    yield "start", root
+            if elem is not root or elem.tag in tags or event == "start":
+                yield event, elem
+
+            if event == "end":
+                elem.clear(keep_tail=False)
+                # Earlier siblings are fully processed by now
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+
+
+def _peek_root_tag(source: Union[str, BinaryIO]) -> Optional[str]:
+    """Tag of the document root, read from the head of *source*.
+
+    File objects are rewound afterwards, so they must be seekable. Returns
+    ``None`` if no root element could be read; the real parse then reports
+    the error.
+    """
+    parser = lxml_etree.XMLPullParser(events=("start",), huge_tree=True)
+    f = open(source, 'rb') if isinstance(source, str) else source
+    position = f.tell()
+    try:
+        while True:
+            chunk = f.read(64 * 1024)
+            if not chunk:
+                return None
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                return elem.tag
+    except lxml_etree.XMLSyntaxError:
+        return None
+    finally:
+        if f is source:
+            f.seek(position)
+        else:
+            f.close()
+
+
+_BACKENDS: Dict[str, type] = {
+    "stdlib": ElementTreeBackend,
+    "lxml": LxmlBackend,
+}
+
+
+def available_backends() -> List[str]:
+    """Names of the backends usable in this environment"""
+    return [name for name in _BACKENDS if name != "lxml" or lxml_etree is not None]
+
+
+def get_backend(name: Optional[str] = None) -> ParserBackend:
+    """Return the backend called *name*.
+
+    When *name* is omitted the ``RHCERT_XML_BACKEND`` environment variable is
+    consulted; ``auto`` (the default) prefers lxml when it is installed.
+    """
+    name = (name or os.environ.get(BACKEND_ENV_VAR) or "auto").lower()
+    if name == "auto":
+        name = "lxml" if lxml_etree is not None else "stdlib"
+
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown XML backend '{name}' (choose from {', '.join(BACKEND_CHOICES)})")
+    if name not in available_backends():
+        raise ValueError(f"XML backend '{name}' is not available; install lxml to use it")
+
+    return _BACKENDS[name]()